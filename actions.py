@@ -21,8 +21,6 @@ Misha Schwartz, and Jaisie Sin
 
 This file contains the different actions that can be made by a Player.
 """
-import pygame
-
 # Actions that can be performed in the game
 ROTATE_CLOCKWISE = ('rotate', 1)
 ROTATE_COUNTER_CLOCKWISE = ('rotate', 3)
@@ -66,15 +64,18 @@ ACTION_PENALTY = {
     PASS: 0
 }
 
+# The pygame key code of each action. These are the values of pygame.K_d,
+# pygame.K_a and so on, written out so that the actions can be used in games
+# that have no display and do not import pygame.
 ACTION_KEY = {
-    ROTATE_CLOCKWISE: pygame.K_d,
-    ROTATE_COUNTER_CLOCKWISE: pygame.K_a,
-    SWAP_HORIZONTAL: pygame.K_q,
-    SWAP_VERTICAL: pygame.K_e,
-    SMASH: pygame.K_SPACE,
-    COMBINE: pygame.K_c,
-    PAINT: pygame.K_r,
-    PASS: pygame.K_TAB
+    ROTATE_CLOCKWISE: 100,  # pygame.K_d
+    ROTATE_COUNTER_CLOCKWISE: 97,  # pygame.K_a
+    SWAP_HORIZONTAL: 113,  # pygame.K_q
+    SWAP_VERTICAL: 101,  # pygame.K_e
+    SMASH: 32,  # pygame.K_SPACE
+    COMBINE: 99,  # pygame.K_c
+    PAINT: 114,  # pygame.K_r
+    PASS: 9  # pygame.K_TAB
 }
 
 # Create a dictionary that is ACTION_KEY inverted
@@ -0,0 +1,443 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains the ArrayBoard class, a compact alternative to the Block
+tree that stores a whole board in two flat byte arrays.
+
+Every possible block of a board with a given max_depth has a fixed slot in the
+arrays. Slots are laid out in preorder over the complete quadtree: the root is
+slot 0, and a block's four children (upper-right, upper-left, lower-left,
+lower-right) follow it, each immediately followed by its own descendants. This
+means that every subtree occupies one contiguous range of slots, so moving a
+subtree is a single slice assignment and no node needs to store its position,
+size or level.
+"""
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+import random
+import math
+
+from block import Block, _majority_colour
+from settings import COLOUR_LIST
+
+# The kind of block stored in a slot.
+EMPTY = 0
+LEAF = 1
+PARENT = 2
+
+# The colour indices that a leaf may hold, in the order of COLOUR_LIST.
+_COLOUR_INDICES = list(range(len(COLOUR_LIST)))
+
+# Layouts that have already been computed, keyed by max_depth.
+_LAYOUTS: Dict[int, _Layout] = {}
+
+
+def _subtree_slots(height: int) -> int:
+    """Return the number of slots used by a complete subtree whose root is
+    <height> levels above max_depth.
+
+    >>> _subtree_slots(0)
+    1
+    >>> _subtree_slots(2)
+    21
+    """
+    return (4 ** (height + 1) - 1) // 3
+
+
+class _Layout:
+    """The slot arithmetic shared by every ArrayBoard with the same max_depth.
+
+    === Public Attributes ===
+    max_depth:
+        The deepest level of the boards that use this layout.
+    levels:
+        The level of the block stored in each slot.
+    slots:
+        slots[h] is the number of slots used by a subtree of height h.
+    """
+    max_depth: int
+    levels: bytes
+    slots: List[int]
+
+    def __init__(self, max_depth: int) -> None:
+        """Initialize the layout of a board with depth <max_depth>.
+        """
+        self.max_depth = max_depth
+        self.slots = [_subtree_slots(h) for h in range(max_depth + 1)]
+
+        levels = bytearray(self.slots[max_depth])
+        self._fill_levels(levels, 0, 0)
+        self.levels = bytes(levels)
+
+    def _fill_levels(self, levels: bytearray, index: int, level: int) -> None:
+        """Record <level> for the subtree rooted at <index> in <levels>.
+        """
+        levels[index] = level
+        if level < self.max_depth:
+            child_slots = self.slots[self.max_depth - level - 1]
+            for j in range(4):
+                self._fill_levels(levels, index + 1 + j * child_slots,
+                                  level + 1)
+
+
+def _layout(max_depth: int) -> _Layout:
+    """Return the shared layout of boards with a depth of <max_depth>.
+    """
+    if max_depth not in _LAYOUTS:
+        _LAYOUTS[max_depth] = _Layout(max_depth)
+
+    return _LAYOUTS[max_depth]
+
+
+def generate_array_board(max_depth: int, size: int) -> ArrayBoard:
+    """Return a new random ArrayBoard with a depth of <max_depth> and
+    dimensions of <size> by <size>.
+
+    Given the same state of the random module, this produces the same board
+    as block.generate_board.
+
+    >>> board = generate_array_board(3, 750)
+    >>> board.kind(0) == PARENT
+    True
+    """
+    board = ArrayBoard(max_depth, size, random.choice(COLOUR_LIST))
+    board.smash(0)
+
+    return board
+
+
+class ArrayBoard:
+    """A Blocky board stored as flat arrays of block kinds and colour indices.
+
+    Blocks are identified by their slot index. The root of the board is at
+    index 0, and child_index gives the index of a block's children in the same
+    order as Block.children.
+
+    === Public Attributes ===
+    max_depth:
+        The deepest level allowed in this board.
+    size:
+        The height and width of the board.
+    position:
+        The (x, y) coordinates of the upper left corner of the board.
+
+    === Representation Invariants ===
+    - The root slot holds a LEAF or a PARENT.
+    - Each child slot of a PARENT holds a LEAF or a PARENT.
+    - Every slot below a LEAF or an EMPTY slot is EMPTY.
+    - Only slots at a level below max_depth hold a PARENT.
+    - The colour index of a LEAF is an index into COLOUR_LIST.
+    """
+    max_depth: int
+    size: int
+    position: Tuple[int, int]
+
+    # === Private Attributes ===
+    # _layout:
+    #   The slot arithmetic for boards of this max_depth.
+    # _kinds:
+    #   The kind of block (EMPTY, LEAF or PARENT) in each slot.
+    # _colours:
+    #   The colour index of each LEAF slot. Other slots hold 0.
+    _layout: _Layout
+    _kinds: bytearray
+    _colours: bytearray
+
+    def __init__(self, max_depth: int, size: int,
+                 colour: Tuple[int, int, int],
+                 position: Tuple[int, int] = (0, 0)) -> None:
+        """Initialize this board as a single leaf of <colour> with a depth of
+        <max_depth> and dimensions of <size> by <size> at <position>.
+
+        Preconditions:
+            - max_depth >= 0
+            - size > 0
+            - colour in COLOUR_LIST
+        """
+        self.max_depth = max_depth
+        self.size = size
+        self.position = position
+        self._layout = _layout(max_depth)
+
+        num_slots = self._layout.slots[max_depth]
+        self._kinds = bytearray(num_slots)
+        self._colours = bytearray(num_slots)
+        self._kinds[0] = LEAF
+        self._colours[0] = COLOUR_LIST.index(colour)
+
+    def __eq__(self, other: ArrayBoard) -> bool:
+        """Return True iff this board and <other> have the same dimensions and
+        the same blocks.
+        """
+        return self.max_depth == other.max_depth and \
+            self.size == other.size and \
+            self.position == other.position and \
+            self._kinds == other._kinds and \
+            self._colours == other._colours
+
+    def level(self, index: int) -> int:
+        """Return the level of the block at <index>.
+        """
+        return self._layout.levels[index]
+
+    def kind(self, index: int) -> int:
+        """Return the kind of the block at <index>: EMPTY, LEAF or PARENT.
+        """
+        return self._kinds[index]
+
+    def colour(self, index: int) -> Optional[Tuple[int, int, int]]:
+        """Return the colour of the block at <index>, or None if it is not a
+        leaf.
+        """
+        if self._kinds[index] != LEAF:
+            return None
+
+        return COLOUR_LIST[self._colours[index]]
+
+    def child_index(self, index: int, child: int) -> int:
+        """Return the index of child number <child> of the block at <index>.
+
+        Precondition: the block at <index> is not at max_depth.
+        """
+        height = self.max_depth - self._layout.levels[index]
+        return index + 1 + child * self._layout.slots[height - 1]
+
+    def _child_slots(self, index: int) -> int:
+        """Return the number of slots used by each child subtree of the block
+        at <index>.
+        """
+        height = self.max_depth - self._layout.levels[index]
+        return self._layout.slots[height - 1]
+
+    def index_of(self, path: List[int]) -> int:
+        """Return the index of the block reached from the root by following the
+        child numbers in <path>.
+
+        Precondition: each block along <path> except the last is a PARENT.
+        """
+        index = 0
+        for child in path:
+            index = self.child_index(index, child)
+
+        return index
+
+    def smashable(self, index: int) -> bool:
+        """Return True iff the block at <index> can be smashed.
+        """
+        return self._kinds[index] == LEAF and \
+            self._layout.levels[index] != self.max_depth
+
+    def smash(self, index: int) -> bool:
+        """Sub-divide the block at <index> into four randomly generated
+        children, exactly as Block.smash does.
+
+        Return True iff the smash was performed.
+        """
+        if not self.smashable(index):
+            return False
+
+        self._smash(index, self._layout.levels[index])
+        return True
+
+    def _smash(self, index: int, level: int) -> None:
+        """Fill the slot at <index>, which is at <level>, with four randomly
+        generated children.
+        """
+        kinds = self._kinds
+        colours = self._colours
+        kinds[index] = PARENT
+        colours[index] = 0
+
+        level += 1
+        child_slots = self._layout.slots[self.max_depth - level]
+        child = index + 1
+        for _ in range(4):
+            if level < self.max_depth and \
+                    random.random() < math.exp(-0.25 * level):
+                self._smash(child, level)
+            else:
+                kinds[child] = LEAF
+                colours[child] = random.choice(_COLOUR_INDICES)
+            child += child_slots
+
+    def swap(self, index: int, direction: int) -> bool:
+        """Swap the children of the block at <index> horizontally if
+        <direction> is 0, or vertically if <direction> is 1.
+
+        Return True iff the swap was performed.
+
+        Precondition: <direction> is either 0 or 1
+        """
+        if self._kinds[index] != PARENT:
+            return False
+
+        n = self._child_slots(index)
+        start = index + 1
+        for array in (self._kinds, self._colours):
+            c = [array[start + j * n:start + (j + 1) * n] for j in range(4)]
+            if direction == 0:
+                array[start:start + 4 * n] = c[1] + c[0] + c[3] + c[2]
+            else:
+                array[start:start + 4 * n] = c[3] + c[2] + c[1] + c[0]
+
+        return True
+
+    def rotate(self, index: int, direction: int) -> bool:
+        """Rotate the block at <index> and all its descendants clockwise if
+        <direction> is 1, or counter-clockwise if <direction> is 3.
+
+        Return True iff the rotate was performed.
+
+        Precondition: <direction> is either 1 or 3.
+        """
+        if self._kinds[index] != PARENT:
+            return False
+
+        height = self.max_depth - self._layout.levels[index]
+        self._rotate(index, height, direction)
+        return True
+
+    def _rotate(self, index: int, height: int, direction: int) -> None:
+        """Rotate the children of the PARENT at <index>, which is <height>
+        levels above max_depth, and recursively all of their descendants.
+        """
+        n = self._layout.slots[height - 1]
+        start = index + 1
+        end = start + 4 * n
+        # The same child order as Block._rotate_children: a clockwise rotation
+        # shifts the four child subtrees left by one, and a counter-clockwise
+        # rotation shifts them right by one.
+        split = start + n if direction == 1 else end - n
+        for array in (self._kinds, self._colours):
+            array[start:end] = array[split:end] + array[start:split]
+
+        if height > 1:
+            kinds = self._kinds
+            for child in range(start, end, n):
+                if kinds[child] == PARENT:
+                    self._rotate(child, height - 1, direction)
+
+    def paint(self, index: int, colour: Tuple[int, int, int]) -> bool:
+        """Change the colour of the block at <index> iff it is a leaf at
+        max_depth and its colour is different from <colour>.
+
+        Return True iff the colour was changed.
+        """
+        colour_index = COLOUR_LIST.index(colour)
+        if self._kinds[index] != LEAF or \
+                self._layout.levels[index] != self.max_depth or \
+                self._colours[index] == colour_index:
+            return False
+
+        self._colours[index] = colour_index
+        return True
+
+    def combine(self, index: int) -> bool:
+        """Turn the block at <index> into a leaf of the majority colour of its
+        children, following the same rules as Block.combine.
+
+        Return True iff the block was turned into a leaf.
+        """
+        if self._kinds[index] != PARENT or \
+                self._layout.levels[index] != self.max_depth - 1:
+            return False
+
+        # The children of a block at max_depth - 1 are consecutive slots.
+        children = range(index + 1, index + 5)
+        majority = _majority_colour([self._colours[i] for i in children])
+        if majority is None:
+            return False
+
+        self._kinds[index] = LEAF
+        self._colours[index] = majority
+        for i in children:
+            self._kinds[i] = EMPTY
+            self._colours[i] = 0
+
+        return True
+
+    def create_copy(self) -> ArrayBoard:
+        """Return a new ArrayBoard that is an independent copy of this board.
+        """
+        copy = ArrayBoard.__new__(ArrayBoard)
+        copy.max_depth = self.max_depth
+        copy.size = self.size
+        copy.position = self.position
+        copy._layout = self._layout
+        copy._kinds = self._kinds[:]
+        copy._colours = self._colours[:]
+
+        return copy
+
+    @staticmethod
+    def from_block(block: Block) -> ArrayBoard:
+        """Return a new ArrayBoard with the same blocks as <block>.
+
+        Precondition: <block> is the root of a board, i.e. its level is 0.
+        """
+        board = ArrayBoard(block.max_depth, block.size, COLOUR_LIST[0],
+                           block.position)
+        board._store(block, 0)
+
+        return board
+
+    def _store(self, block: Block, index: int) -> None:
+        """Copy <block> and its descendants into the subtree at <index>.
+        """
+        if len(block.children) == 0:
+            self._kinds[index] = LEAF
+            self._colours[index] = COLOUR_LIST.index(block.colour)
+        else:
+            self._kinds[index] = PARENT
+            self._colours[index] = 0
+            child_slots = self._child_slots(index)
+            for j, child in enumerate(block.children):
+                self._store(child, index + 1 + j * child_slots)
+
+    def to_block(self) -> Block:
+        """Return a new Block tree with the same blocks as this board.
+        """
+        block = Block(self.position, self.size, None, 0, self.max_depth)
+        self._load(0, block)
+
+        return block
+
+    def _load(self, index: int, block: Block) -> None:
+        """Give <block>, a new Block with no colour, the colour or the children
+        of the subtree at <index>.
+        """
+        if self._kinds[index] == LEAF:
+            block.colour = COLOUR_LIST[self._colours[index]]
+        else:
+            child_slots = self._child_slots(index)
+            for j, child in enumerate(block._new_children()):
+                self._load(index + 1 + j * child_slots, child)
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'random', 'typing', '__future__', 'math',
+            'block', 'settings'
+        ],
+        'max-attributes': 15
+    })
@@ -0,0 +1,359 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains benchmarks for the data structures used in the game.
+
+Run this file directly to print the results of every benchmark.
+"""
+from typing import Callable, List, Optional, Tuple
+import random
+import time
+import tracemalloc
+
+from block import Block, generate_board
+from goal import BlobGoal, PerimeterGoal, _colour_grid, _flatten
+from settings import BOARD_SIZE, COLOUR_LIST
+from persistent import PersistentBoard
+
+
+def _time(function: Callable[[], object], repeat: int,
+          rounds: int = 5) -> float:
+    """Return the average number of milliseconds that a call to <function>
+    takes over <repeat> calls, in the fastest of <rounds> rounds.
+    """
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            function()
+        best = min(best, time.perf_counter() - start)
+
+    return best / repeat * 1000
+
+
+def _count_nodes(block: Block) -> int:
+    """Return the number of blocks in the tree rooted at <block>.
+    """
+    return 1 + sum(_count_nodes(child) for child in block.children)
+
+
+def _smash_all(block: Block) -> None:
+    """Smash every leaf of <block> until all of its leaves are at max_depth.
+    """
+    if len(block.children) == 0:
+        block.smash()
+
+    for child in block.children:
+        _smash_all(child)
+
+
+def _complete_board(max_depth: int) -> Block:
+    """Return a new board whose leaves are all at <max_depth>, after
+    traversing it once.
+    """
+    board = generate_board(max_depth, BOARD_SIZE)
+    _smash_all(board)
+    _count_nodes(board)
+
+    return board
+
+
+def _traced_bytes(function: Callable[[], object]) -> Tuple[object, int]:
+    """Return the result of calling <function> and the number of bytes of
+    memory that it allocated and did not free.
+    """
+    tracemalloc.start()
+    result = function()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return result, used
+
+
+def bench_block_layout(depths: List[int], boards: int = 100) \
+        -> List[Tuple[int, float, float, float]]:
+    """Return (depth, bytes per node of a generated board, bytes per node of a
+    complete board, generate_board milliseconds) for each of <depths>.
+
+    Generated boards are measured over <boards> seeded boards. A complete
+    board is smashed down to max_depth everywhere and then traversed, so that
+    every depth reports the cost of the same shape of tree.
+    """
+    results = []
+    for depth in depths:
+        used = 0
+        nodes = 0
+        for seed in range(boards):
+            random.seed(seed)
+            board, board_bytes = _traced_bytes(
+                lambda: generate_board(depth, BOARD_SIZE))
+            used += board_bytes
+            nodes += _count_nodes(board)
+        generated = used / nodes
+
+        random.seed(depth)
+        board, used = _traced_bytes(lambda: _complete_board(depth))
+        complete = used / _count_nodes(board)
+        del board
+
+        random.seed(depth)
+        millis = _time(lambda: generate_board(depth, BOARD_SIZE), boards)
+        results.append((depth, generated, complete, millis))
+
+    return results
+
+
+def bench_copy_and_move(depths: List[int], repeat: int = 20) \
+        -> List[Tuple[int, float, float]]:
+    """Return (depth, Block milliseconds, PersistentBoard milliseconds) for
+    copying a complete board of each of <depths> and rotating one block just
+    above max_depth on the copy.
+    """
+    results = []
+    for depth in depths:
+        random.seed(depth)
+        board = _complete_board(depth)
+        persistent = PersistentBoard.from_block(board)
+        path = [0] * (depth - 1)
+
+        def block_move() -> None:
+            block = board.create_copy()
+            for i in path:
+                block = block.children[i]
+            block.rotate(1)
+
+        def persistent_move() -> None:
+            persistent.create_copy().rotate(path, 1)
+
+        results.append((depth, _time(block_move, repeat),
+                        _time(persistent_move, repeat)))
+
+    return results
+
+
+def _flatten_by_cell(block: Block) -> List[List[Tuple[int, int, int]]]:
+    """Return the same result as goal._flatten, built one cell at a time the
+    way the list version of _flatten does.
+    """
+    n = 2 ** (block.max_depth - block.level)
+    result = [[None] * n for _ in range(n)]
+    _fill_cells(block, result, 0, 0, n)
+
+    return result
+
+
+def _fill_cells(block: Block,
+                result: List[List[Optional[Tuple[int, int, int]]]],
+                x: int, y: int, width: int) -> None:
+    """Write the colour of each unit cell of <block>, whose upper left cell is
+    at column <x> and row <y>, into <result>.
+    """
+    if len(block.children) == 0:
+        for i in range(x, x + width):
+            for j in range(y, y + width):
+                result[i][j] = block.colour
+    else:
+        half = width // 2
+        c = block.children
+        _fill_cells(c[0], result, x + half, y, half)
+        _fill_cells(c[1], result, x, y, half)
+        _fill_cells(c[2], result, x, y + half, half)
+        _fill_cells(c[3], result, x + half, y + half, half)
+
+
+def bench_flatten(depths: List[int], boards: int = 5) \
+        -> List[Tuple[int, float, float, float]]:
+    """Return (depth, list milliseconds, colour grid milliseconds, _flatten
+    adapter milliseconds) for flattening random boards of each of <depths>.
+    """
+    results = []
+    for depth in depths:
+        random.seed(depth)
+        board_list = [generate_board(depth, BOARD_SIZE) for _ in range(boards)]
+        repeat = max(1, 2 ** (9 - depth))
+
+        def flatten_all(flatten: Callable[[Block], object]) -> None:
+            for b in board_list:
+                flatten(b)
+
+        results.append((
+            depth,
+            _time(lambda: flatten_all(_flatten_by_cell), repeat) / boards,
+            _time(lambda: flatten_all(_colour_grid), repeat) / boards,
+            _time(lambda: flatten_all(_flatten), repeat) / boards))
+
+    return results
+
+
+def _flood_fill_score(goal: BlobGoal, board: Block) -> int:
+    """Return the score of <goal> on <board>, found by flood filling from
+    every cell with BlobGoal._undiscovered_blob_size.
+    """
+    flattened = _flatten(board)
+    n = len(flattened)
+    visited = [[-1] * n for _ in range(n)]
+
+    return max(goal._undiscovered_blob_size((i, j), flattened, visited)
+               for i in range(n) for j in range(n))
+
+
+def bench_blob_goal(depths: List[int], boards: int = 5) \
+        -> List[Tuple[int, float, float]]:
+    """Return (depth, flood fill milliseconds, BlobGoal.score milliseconds)
+    for scoring random boards of each of <depths>.
+    """
+    goal = BlobGoal(COLOUR_LIST[0])
+    results = []
+    for depth in depths:
+        random.seed(depth)
+        board_list = [generate_board(depth, BOARD_SIZE) for _ in range(boards)]
+        repeat = max(1, 2 ** (8 - depth))
+
+        def score_all(score: Callable[[BlobGoal, Block], int]) -> None:
+            for b in board_list:
+                score(goal, b)
+
+        results.append((
+            depth,
+            _time(lambda: score_all(_flood_fill_score), repeat) / boards,
+            _time(lambda: score_all(BlobGoal.score), repeat) / boards))
+
+    return results
+
+
+def _flattened_perimeter_score(goal: PerimeterGoal, board: Block) -> int:
+    """Return the score of <goal> on <board>, found by counting the cells on
+    the edges of the flattened board.
+    """
+    flattened = _flatten(board)
+    edges = flattened[0] + flattened[-1] + \
+        [column[0] for column in flattened] + \
+        [column[-1] for column in flattened]
+
+    return edges.count(goal.colour)
+
+
+def bench_perimeter_goal(depths: List[int], boards: int = 5) \
+        -> List[Tuple[int, float, float]]:
+    """Return (depth, flattened milliseconds, PerimeterGoal.score
+    milliseconds) for scoring random boards of each of <depths>.
+    """
+    goal = PerimeterGoal(COLOUR_LIST[0])
+    results = []
+    for depth in depths:
+        random.seed(depth)
+        board_list = [generate_board(depth, BOARD_SIZE) for _ in range(boards)]
+        repeat = max(1, 2 ** (8 - depth))
+
+        def score_all(score: Callable[[PerimeterGoal, Block], int]) -> None:
+            for b in board_list:
+                score(goal, b)
+
+        results.append((
+            depth,
+            _time(lambda: score_all(_flattened_perimeter_score), repeat)
+            / boards,
+            _time(lambda: score_all(PerimeterGoal.score), repeat) / boards))
+
+    return results
+
+
+def bench_goal_state(depths: List[int], moves: int = 50) \
+        -> List[Tuple[int, float, float, float, float]]:
+    """Return (depth, BlobGoal.score milliseconds, BlobState milliseconds,
+    PerimeterGoal.score milliseconds, PerimeterState milliseconds) for
+    scoring a random board of each of <depths> after rotating a random block
+    one level above max_depth, <moves> times.
+    """
+    results = []
+    for depth in depths:
+        random.seed(depth)
+        board = generate_board(depth, BOARD_SIZE)
+        _smash_all(board)
+        blocks = []
+        for _ in range(moves):
+            block = board
+            while block.level < depth - 1:
+                block = random.choice(block.children)
+            blocks.append(block)
+
+        row = [depth]
+        for goal in [BlobGoal(COLOUR_LIST[0]), PerimeterGoal(COLOUR_LIST[0])]:
+            state = goal.new_state(board)
+            state.score(goal)
+
+            def rescore() -> None:
+                for b in blocks:
+                    b.rotate(1)
+                    goal.score(board)
+
+            def update() -> None:
+                for b in blocks:
+                    b.rotate(1)
+                    state.changed(b)
+                    state.score(goal)
+
+            row.append(_time(rescore, 1, 3) / moves)
+            row.append(_time(update, 1, 3) / moves)
+        results.append(tuple(row))
+
+    return results
+
+
+if __name__ == '__main__':
+    print('=== Block layout ===')
+    print('depth  bytes/node (generated)  bytes/node (complete)  '
+          'generate_board (ms)')
+    for d, generated, complete, ms in bench_block_layout([3, 4, 5, 6, 7]):
+        print(f'{d:5}  {generated:22.1f}  {complete:21.1f}  {ms:19.3f}')
+
+    print()
+    print('=== Copy and rotate one block ===')
+    print('depth  Block (ms)  PersistentBoard (ms)')
+    for d, block_ms, persistent_ms in bench_copy_and_move([3, 4, 5, 6, 7]):
+        print(f'{d:5}  {block_ms:10.3f}  {persistent_ms:20.4f}')
+
+    print()
+    print('=== Flatten a random board ===')
+    print('depth  list (ms)  colour grid (ms)  _flatten adapter (ms)')
+    for d, list_ms, grid_ms, adapter_ms in bench_flatten(range(3, 10)):
+        print(f'{d:5}  {list_ms:9.3f}  {grid_ms:16.3f}  {adapter_ms:21.3f}')
+
+    print()
+    print('=== Score a BlobGoal ===')
+    print('depth  flood fill (ms)  BlobGoal.score (ms)')
+    for d, fill_ms, score_ms in bench_blob_goal(range(3, 10)):
+        print(f'{d:5}  {fill_ms:15.3f}  {score_ms:19.3f}')
+
+    print()
+    print('=== Score a PerimeterGoal ===')
+    print('depth  flattened (ms)  PerimeterGoal.score (ms)')
+    for d, flat_ms, score_ms in bench_perimeter_goal(range(3, 11)):
+        print(f'{d:5}  {flat_ms:14.3f}  {score_ms:24.4f}')
+
+    print()
+    print('=== Score after a move ===')
+    print('depth  BlobGoal (ms)  BlobState (ms)  PerimeterGoal (ms)  '
+          'PerimeterState (ms)')
+    for d, blob_ms, blob_state_ms, perimeter_ms, perimeter_state_ms in \
+            bench_goal_state(range(3, 8)):
+        print(f'{d:5}  {blob_ms:13.3f}  {blob_state_ms:14.3f}  '
+              f'{perimeter_ms:18.3f}  {perimeter_state_ms:19.3f}')
@@ -28,6 +28,16 @@ import math
 
 from settings import colour_name, COLOUR_LIST
 
+# The kinds of operation that a Journal records.
+_SMASH = 0
+_SWAP = 1
+_ROTATE = 2
+_PAINT = 3
+_COMBINE = 4
+
+# Zobrist keys are 64-bit integers.
+_HASH_MASK = (1 << 64) - 1
+
 
 def generate_board(max_depth: int, size: int) -> Block:
     """Return a new game board with a depth of <max_depth> and dimensions of
@@ -47,6 +57,181 @@ def generate_board(max_depth: int, size: int) -> Block:
     return board
 
 
+class _BoardContext:
+    """The data shared by every Block of a board.
+
+    === Public Attributes ===
+    max_depth:
+        The deepest level allowed in the board.
+    level:
+        The level of the Block that this context was created for, which is the
+        root of the board.
+    sizes:
+        sizes[i] is the size of a block at level i of the board. Levels above
+        <level> have a size of 0.
+    hash:
+        The Zobrist hash of the board, or None if it has not been computed
+        since the board was last changed by something other than a Block
+        operation.
+    """
+    __slots__ = ('max_depth', 'level', 'sizes', 'hash')
+    max_depth: int
+    level: int
+    sizes: Tuple[int, ...]
+    hash: Optional[int]
+
+    def __init__(self, max_depth: int, level: int, size: int) -> None:
+        """Initialize the context of a board with depth <max_depth> whose root
+        is at <level> and has dimensions <size> by <size>.
+        """
+        sizes = [0] * level
+        for _ in range(level, max_depth + 1):
+            sizes.append(size)
+            size = round(size / 2.0)
+
+        self.max_depth = max_depth
+        self.level = level
+        self.sizes = tuple(sizes)
+        self.hash = None
+
+
+def _mix(x: int) -> int:
+    """Return a well-mixed 64-bit integer computed from <x> (the splitmix64
+    finalizer).
+
+    >>> _mix(0) == _mix(0)
+    True
+    >>> _mix(0) != _mix(1)
+    True
+    """
+    x = (x + 0x9E3779B97F4A7C15) & _HASH_MASK
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _HASH_MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _HASH_MASK
+    return x ^ (x >> 31)
+
+
+def _leaf_key(level: int, position: Tuple[int, int],
+              colour: Tuple[int, int, int]) -> int:
+    """Return the Zobrist key of a leaf of <colour> at <position> and <level>.
+
+    The keys do not depend on any state, so hashes can be compared between
+    boards, turns and processes.
+    """
+    cell = (level << 40) | (position[0] << 20) | position[1]
+    rgb = (colour[0] << 16) | (colour[1] << 8) | colour[2]
+    return _mix(_mix(cell) ^ rgb)
+
+
+def _majority_colour(colours: List[Optional[Tuple[int, int, int]]]) -> \
+        Optional[Tuple[int, int, int]]:
+    """Return the colour that occurs strictly more often in <colours> than any
+    other colour, or None if there is no such colour.
+
+    >>> _majority_colour([(0, 0, 0), (1, 1, 1), (0, 0, 0), (2, 2, 2)])
+    (0, 0, 0)
+    >>> _majority_colour([(0, 0, 0), (1, 1, 1), (0, 0, 0), (1, 1, 1)]) is None
+    True
+    """
+    counts = {}
+    for colour in colours:
+        counts[colour] = counts.get(colour, 0) + 1
+
+    ranked = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+    if len(ranked) > 1 and ranked[0][1] == ranked[1][1]:
+        return None
+
+    return ranked[0][0]
+
+
+class Journal:
+    """A record of the Block operations performed since it was created, which
+    can be undone in reverse order.
+
+    Pass a Journal to smash, swap, rotate, paint or combine to record the
+    operation if it is performed. Each record is four entries in a flat
+    list: the kind of operation, the Block it acted on, that Block's position,
+    and what is needed to undo it.
+
+    >>> board = Block((0, 0), 750, (1, 128, 181), 0, 1)
+    >>> journal = Journal()
+    >>> mark = journal.checkpoint()
+    >>> board.smash(journal)
+    True
+    >>> journal.rollback(mark)
+    >>> len(board.children)
+    0
+    """
+    # === Private Attributes ===
+    # _log:
+    #   The records of the operations, oldest first.
+    _log: list
+
+    def __init__(self) -> None:
+        """Initialize this Journal with no records.
+        """
+        self._log = []
+
+    def __len__(self) -> int:
+        """Return the number of operations recorded in this Journal.
+        """
+        return len(self._log) // 4
+
+    def _record(self, kind: int, block: Block, data: object) -> None:
+        """Record that the operation <kind> was performed on <block>, where
+        <data> is what is needed to undo it.
+        """
+        log = self._log
+        log.append(kind)
+        log.append(block)
+        log.append(block.position)
+        log.append(data)
+
+    def checkpoint(self) -> int:
+        """Return a checkpoint that rollback can later return to.
+
+        Checkpoints may be nested: rolling back to a checkpoint also undoes
+        every operation recorded after any later checkpoint.
+        """
+        return len(self._log)
+
+    def undo(self) -> bool:
+        """Undo the most recent operation in this Journal and remove it.
+
+        Return True iff there was an operation to undo.
+        """
+        log = self._log
+        if len(log) == 0:
+            return False
+
+        data = log.pop()
+        position = log.pop()
+        block = log.pop()
+        kind = log.pop()
+
+        # Undoing the later records may have left the block's own position
+        # stale, and the hash of the board depends on it.
+        block._update_children_positions(position)
+        if kind == _SWAP:
+            # A swap in either direction is its own inverse.
+            block.swap(data)
+        elif kind == _ROTATE:
+            block.rotate(4 - data)
+        elif kind == _PAINT:
+            block._recolour(data)
+        elif kind == _SMASH:
+            block._unsmash(data)
+        else:
+            block._uncombine(data)
+
+        return True
+
+    def rollback(self, checkpoint: int) -> None:
+        """Undo every operation recorded since <checkpoint> was taken.
+        """
+        while len(self._log) > checkpoint:
+            self.undo()
+
+
 class Block:
     """A square Block in the Blocky game, represented as a tree.
 
@@ -92,6 +277,8 @@ class Block:
         - its colour is not None.
     - level <= max_depth
     """
+    __slots__ = ('_position', 'colour', 'level', '_children', '_context',
+                 '_stale')
     position: Tuple[int, int]
     size: int
     colour: Optional[Tuple[int, int, int]]
@@ -99,6 +286,24 @@ class Block:
     max_depth: int
     children: List[Block]
 
+    # === Private Attributes ===
+    # _position:
+    #   The last position assigned to this Block, or None if it has never been
+    #   placed. It is only guaranteed to be current if this Block was reached
+    #   through its parent's children.
+    # _children:
+    #   The list of children returned by <children>.
+    # _context:
+    #   The data shared by every Block of this board, from which size and
+    #   max_depth are derived and in which the board's hash is kept.
+    # _stale:
+    #   True iff this Block has moved since the positions of its children
+    #   were last set, so they must be set before the children are used.
+    _position: Optional[Tuple[int, int]]
+    _children: List[Block]
+    _context: _BoardContext
+    _stale: bool
+
     def __init__(self, position: Tuple[int, int], size: int,
                  colour: Optional[Tuple[int, int, int]], level: int,
                  max_depth: int) -> None:
@@ -111,12 +316,94 @@ class Block:
             - level >= 0
             - max_depth >= level
         """
-        self.position = position
-        self.size = size
+        self._position = position
         self.colour = colour
         self.level = level
-        self.max_depth = max_depth
-        self.children = []
+        self._children = []
+        self._context = _BoardContext(max_depth, level, size)
+        self._stale = False
+
+    def _new_child(self, colour: Optional[Tuple[int, int, int]]) -> Block:
+        """Return a new Block of <colour> with no children one level below this
+        Block, sharing this Block's context.
+
+        The new Block has no position until this Block places its children.
+        """
+        child = Block.__new__(Block)
+        child._position = None
+        child.colour = colour
+        child.level = self.level + 1
+        child._children = []
+        child._context = self._context
+        child._stale = False
+
+        return child
+
+    def _new_children(self) -> List[Block]:
+        """Turn this leaf into a parent of four new children with no colour,
+        and return the children.
+
+        The children are placed when they are first reached. The hash of the
+        board is not updated.
+        """
+        self.colour = None
+        self._children = [self._new_child(None) for _ in range(4)]
+        self._stale = True
+
+        return self._children
+
+    @property
+    def position(self) -> Tuple[int, int]:
+        """The (x, y) coordinates of the upper left corner of this Block.
+        """
+        return self._position
+
+    @property
+    def size(self) -> int:
+        """The height and width of this square Block.
+        """
+        return self._context.sizes[self.level]
+
+    @property
+    def max_depth(self) -> int:
+        """The deepest level allowed in the overall block structure.
+        """
+        return self._context.max_depth
+
+    @property
+    def children(self) -> List[Block]:
+        """The blocks into which this block is subdivided.
+        """
+        if self._stale:
+            self._place_children()
+        return self._children
+
+    @children.setter
+    def children(self, children: List[Block]) -> None:
+        """Set the blocks into which this block is subdivided.
+
+        The new children may come from anywhere, so the hash of the board has
+        to be computed again.
+        """
+        self._children = children
+        self._context.hash = None
+
+    def _place_children(self) -> None:
+        """Set the position of each of this Block's children from this Block's
+        position, and mark their own children as needing the same.
+        """
+        self._stale = False
+        x, y = self._position
+        size = self._context.sizes[self.level + 1]
+        c = self._children
+
+        c[0]._position = (x + size, y)
+        c[1]._position = self._position
+        c[2]._position = (x, y + size)
+        c[3]._position = (x + size, y + size)
+        for child in c:
+            if len(child._children) != 0:
+                child._stale = True
 
     def __str__(self) -> str:
         """Return this Block in a string format.
@@ -143,6 +430,19 @@ class Block:
     def __eq__(self, other: Block) -> bool:
         """Return True iff this Block and all its descendents are equivalent to
         the <other> Block and all its descendents.
+
+        Two whole boards with different hashes are never equal, so their hashes
+        are compared before walking the trees.
+        """
+        if self._is_root() and other._is_root() and \
+                self.zobrist_hash() != other.zobrist_hash():
+            return False
+
+        return self._equal(other)
+
+    def _equal(self, other: Block) -> bool:
+        """Return True iff this Block and all its descendents are equivalent to
+        the <other> Block and all its descendents, by walking both trees.
         """
         if len(self.children) == 0 and len(other.children) == 0:
             # Both self and other are leaves.
@@ -157,16 +457,85 @@ class Block:
         else:
             # Both self and other have four children.
             for i in range(4):
-                # The != operator also uses the __eq__ special method.
-                if self.children[i] != other.children[i]:
+                if not self.children[i]._equal(other.children[i]):
                     return False
 
             return True
 
+    def __hash__(self) -> int:
+        """Return the Zobrist hash of this Block.
+        """
+        return self.zobrist_hash()
+
+    def _is_root(self) -> bool:
+        """Return True iff this Block is the root of the board that its context
+        belongs to.
+        """
+        return self.level == self._context.level
+
+    def zobrist_hash(self) -> int:
+        """Return the 64-bit Zobrist hash of this Block: the XOR of the keys of
+        the level, position and colour of each of its leaves.
+
+        For the root of a board, the hash is kept up to date by every Block
+        operation, so reading it costs nothing unless the board was changed
+        some other way (such as by assigning to children). For any other
+        Block, the hash is computed from its leaves.
+
+        Equal boards have equal hashes.
+        """
+        context = self._context
+        if not self._is_root():
+            return self._subtree_hash()
+
+        if context.hash is None:
+            context.hash = self._adopt(context)
+
+        return context.hash
+
+    def _subtree_hash(self) -> int:
+        """Return the XOR of the Zobrist keys of the leaves of this Block.
+        """
+        if len(self.children) == 0:
+            return _leaf_key(self.level, self._position, self.colour)
+
+        result = 0
+        for child in self.children:
+            result ^= child._subtree_hash()
+
+        return result
+
+    def _adopt(self, context: _BoardContext) -> int:
+        """Make this Block and all its descendants use <context>, and return
+        the XOR of the Zobrist keys of its leaves.
+
+        This joins blocks that were built separately into one board.
+        """
+        self._context = context
+        if len(self.children) == 0:
+            return _leaf_key(self.level, self._position, self.colour)
+
+        result = 0
+        for child in self.children:
+            result ^= child._adopt(context)
+
+        return result
+
+    def _rehash(self) -> None:
+        """Remove this Block's leaves from the hash of its board, or add them
+        back, if the hash is being kept.
+
+        Every operation calls this once before and once after it changes this
+        Block, which costs time proportional to the number of leaves changed.
+        """
+        context = self._context
+        if context.hash is not None:
+            context.hash ^= self._subtree_hash()
+
     def _child_size(self) -> int:
         """Return the size of this Block's children.
         """
-        return round(self.size / 2.0)
+        return self._context.sizes[self.level + 1]
 
     def _children_positions(self) -> List[Tuple[int, int]]:
         """Return the positions of this Block's four children.
@@ -186,9 +555,12 @@ class Block:
 
         <position> is the (x, y) coordinates of the upper-left corner of this
         Block.
+
+        The descendants are updated lazily: their positions are set the next
+        time they are reached through <children>.
         """
-        # TODO: Implement me
-        return  # FIXME
+        self._position = position
+        self._stale = len(self._children) != 0
 
     def smashable(self) -> bool:
         """Return True iff this block can be smashed.
@@ -198,54 +570,146 @@ class Block:
         """
         return self.level != self.max_depth and len(self.children) == 0
 
-    def smash(self) -> bool:
+    def smash(self, journal: Optional[Journal] = None) -> bool:
         """Sub-divide this block so that it has four randomly generated
         children.
 
         If this Block's level is <max_depth>, do nothing. If this block has
         children, do nothing.
         
-        Return True iff the smash was performed.
+        Return True iff the smash was performed. If it was, and <journal> is
+        not None, record the smash in <journal>.
         """
-        # TODO: Implement me
-        return True  # FIXME
+        if not self.smashable():
+            return False
+
+        if journal is not None:
+            journal._record(_SMASH, self, self.colour)
 
-    def swap(self, direction: int) -> bool:
+        self._rehash()
+        self._fill_randomly()
+        self._rehash()
+        return True
+
+    def _fill_randomly(self) -> None:
+        """Give this leaf four randomly generated children, smashing each of
+        them again with a probability that falls with its level.
+        """
+        level = self.level + 1
+        max_depth = self._context.max_depth
+
+        for child in self._new_children():
+            if level < max_depth and \
+                    random.random() < math.exp(-0.25 * level):
+                child._fill_randomly()
+            else:
+                child.colour = random.choice(COLOUR_LIST)
+
+    def _unsmash(self, colour: Tuple[int, int, int]) -> None:
+        """Undo a smash of this Block, which had <colour> before it.
+        """
+        self._rehash()
+        self.colour = colour
+        self._children = []
+        self._stale = False
+        self._rehash()
+
+    def swap(self, direction: int, journal: Optional[Journal] = None) -> bool:
         """Swap the child Blocks of this Block.
 
         If this Block has no children, do nothing. Otherwise, if <direction> is
         1, swap vertically. If <direction> is 0, swap horizontally.
         
-        Return True iff the swap was performed.
+        Return True iff the swap was performed. If it was, and <journal> is not
+        None, record the swap in <journal>.
 
         Precondition: <direction> is either 0 or 1
         """
-        # TODO: Implement me
-        return True  # FIXME
+        if len(self.children) == 0:
+            return False
+
+        if journal is not None:
+            journal._record(_SWAP, self, direction)
+
+        self._rehash()
+        c = self._children
+        if direction == 0:
+            self._children = [c[1], c[0], c[3], c[2]]
+        else:
+            self._children = [c[3], c[2], c[1], c[0]]
+
+        self._update_children_positions(self.position)
+        self._rehash()
+        return True
 
-    def rotate(self, direction: int) -> bool:
+    def rotate(self, direction: int, journal: Optional[Journal] = None) \
+            -> bool:
         """Rotate this Block and all its descendants.
 
         If this Block has no children, do nothing. If <direction> is 1, rotate
         clockwise. If <direction> is 3, rotate counter-clockwise.
         
-        Return True iff the rotate was performed.
+        Return True iff the rotate was performed. If it was, and <journal> is
+        not None, record the rotate in <journal>.
+
+        Precondition: <direction> is either 1 or 3.
+        """
+        if len(self.children) == 0:
+            return False
+
+        if journal is not None:
+            journal._record(_ROTATE, self, direction)
+
+        self._rehash()
+        self._rotate_children(direction)
+        self._update_children_positions(self.position)
+        self._rehash()
+        return True
+
+    def _rotate_children(self, direction: int) -> None:
+        """Rotate the children of this Block, and recursively all of their
+        descendants, in <direction> without updating any positions.
 
         Precondition: <direction> is either 1 or 3.
         """
-        # TODO: Implement me
-        return True  # FIXME
+        # Positions are not needed here, so the children are used unplaced.
+        for child in self._children:
+            if len(child._children) != 0:
+                child._rotate_children(direction)
+
+        c = self._children
+        if direction == 1:
+            # The upper-left child moves to the upper-right corner, and so on.
+            self._children = [c[1], c[2], c[3], c[0]]
+        else:
+            self._children = [c[3], c[0], c[1], c[2]]
 
-    def paint(self, colour: Tuple[int, int, int]) -> bool:
+    def paint(self, colour: Tuple[int, int, int],
+              journal: Optional[Journal] = None) -> bool:
         """Change this Block's colour iff it is a leaf at a level of max_depth
         and its colour is different from <colour>.
 
-        Return True iff this Block's colour was changed.
+        Return True iff this Block's colour was changed. If it was, and
+        <journal> is not None, record the paint in <journal>.
         """
-        # TODO: Implement me
-        return True  # FIXME
+        if self.level != self.max_depth or len(self.children) != 0 or \
+                self.colour == colour:
+            return False
+
+        if journal is not None:
+            journal._record(_PAINT, self, self.colour)
+
+        self._recolour(colour)
+        return True
 
-    def combine(self) -> bool:
+    def _recolour(self, colour: Tuple[int, int, int]) -> None:
+        """Set the colour of this leaf to <colour>.
+        """
+        self._rehash()
+        self.colour = colour
+        self._rehash()
+
+    def combine(self, journal: Optional[Journal] = None) -> bool:
         """Turn this Block into a leaf based on the majority colour of its
         children.
 
@@ -256,18 +720,60 @@ class Block:
         If there is no majority colour, do nothing. If this block is not at a
         level of max_depth - 1, or this block has no children, do nothing.
 
-        Return True iff this Block was turned into a leaf node.
+        Return True iff this Block was turned into a leaf node. If it was, and
+        <journal> is not None, record the combine in <journal>.
+        """
+        if self.level != self.max_depth - 1 or len(self.children) == 0:
+            return False
+
+        majority = _majority_colour([child.colour for child in self.children])
+        if majority is None:
+            return False
+
+        if journal is not None:
+            journal._record(_COMBINE, self, self._children)
+
+        self._rehash()
+        self.colour = majority
+        self._children = []
+        self._stale = False
+        self._rehash()
+        return True
+
+    def _uncombine(self, children: List[Block]) -> None:
+        """Undo a combine of this Block, which had <children> before it.
         """
-        # TODO: Implement me
-        return True  # FIXME
+        self._rehash()
+        self.colour = None
+        self._children = children
+        self._stale = True
+        self._rehash()
 
     def create_copy(self) -> Block:
         """Return a new Block that is a deep copy of this Block.
 
         Remember that a deep copy has new blocks (not aliases) at every level.
         """
-        # TODO: Implement me
-        pass  # FIXME
+        context = _BoardContext(self.max_depth, self.level, self.size)
+        if self._is_root():
+            context.hash = self._context.hash
+
+        return self._copy(context)
+
+    def _copy(self, context: _BoardContext) -> Block:
+        """Return a deep copy of this Block that uses <context>.
+        """
+        # The copy is placed exactly as this Block is, including any children
+        # that are still waiting to be placed.
+        copy = Block.__new__(Block)
+        copy._position = self._position
+        copy.colour = self.colour
+        copy.level = self.level
+        copy._children = [child._copy(context) for child in self._children]
+        copy._context = context
+        copy._stale = self._stale
+
+        return copy
 
 
 if __name__ == '__main__':
@@ -23,12 +23,12 @@ This file contains the different game states for the Blocky game.
 """
 
 from __future__ import annotations
-from typing import Dict, List, Optional, Tuple
+from typing import List, Optional, Tuple
 import pygame
 
-from actions import ACTION_MESSAGE, ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE,\
-    SWAP_HORIZONTAL, SWAP_VERTICAL, SMASH, PASS, PAINT, COMBINE, ACTION_PENALTY
+from actions import ACTION_MESSAGE
 from block import Block
+from engine import GameData, apply_move, final_scores, winner
 from player import Player
 from renderer import Renderer
 from settings import ANIMATION_DURATION
@@ -52,69 +52,6 @@ def _block_to_squares(board: Block) -> List[Tuple[Tuple[int, int, int],
     return []  # FIXME
 
 
-class GameData:
-    """
-    A bundle of the data needed for a Blocky game.
-
-    === Public Attributes ===
-    max_turns:
-        The maximum number of turns for the game.
-    board:
-        The Blocky board on which this game will be played.
-    players:
-        The entities that are playing this game.
-    smashes:
-        The number of smashes done by each player.
-    combines:
-        The number of combines done by each player.
-    paints:
-        The number of paints done by each player.
-
-    === Representation Invariants ===
-    - len(players) >= 1
-    """
-    max_turns: int
-    board: Block
-    players: List[Player]
-    smashes: Dict[int, int]
-    combines: Dict[int, int]
-    paints: Dict[int, int]
-
-    def __init__(self, board: Block, players: List[Player]) -> None:
-        """Initialize the game data, saving a reference to <board> and
-        <players>.
-
-        Precondition:
-            - len(players) >= 1
-        """
-        self.max_turns = 0
-        self.board = board
-        self.players = players
-
-        self.smashes = {}
-        self.combines = {}
-        self.paints = {}
-
-        # Start off all counts at 0
-        for player in players:
-            self.smashes[player.id] = 0
-            self.combines[player.id] = 0
-            self.paints[player.id] = 0
-
-    def calculate_score(self, player_id: int) -> Tuple[int, int]:
-        """Return a tuple containing first the <player_id>'s score based on
-        their goal in the game and second the deductions from their score based
-        on the actions they've taken.
-        """
-        goal_score = self.players[player_id].goal.score(self.board)
-
-        penalty = self.smashes[player_id] * ACTION_PENALTY[SMASH] + \
-                  self.combines[player_id] * ACTION_PENALTY[COMBINE] + \
-                  self.paints[player_id] * ACTION_PENALTY[PAINT]
-
-        return goal_score, penalty
-
-
 class GameState:
     """One of the different states that a Blocky game can be in.
     """
@@ -184,29 +121,8 @@ class MainState(GameState):
     def _do_move(self, move: Tuple[str, Optional[int], Block]) -> bool:
         """Attempt to do the player's requested move.
         """
-        action = (move[0], move[1])
-        direction = move[1]
-        block = move[2]
-        player = self._current_player()
-        move_successful = False
-
-        if action in [ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE]:
-            move_successful = block.rotate(direction)
-        elif action in [SWAP_HORIZONTAL, SWAP_VERTICAL]:
-            move_successful = block.swap(direction)
-        elif action == SMASH:
-            move_successful = block.smash()
-            self._data.smashes[player.id] += int(move_successful)
-        elif action == PAINT:
-            move_successful = block.paint(self._current_player().goal.colour)
-            self._data.paints[player.id] += int(move_successful)
-        elif action == COMBINE:
-            move_successful = block.combine()
-            self._data.combines[player.id] += int(move_successful)
-        elif action == PASS:
-            # Do nothing
-            move_successful = True
-
+        move_successful = apply_move(self._data, self._current_player().id,
+                                     move)
         if move_successful:
             self._update_player()
 
@@ -329,12 +245,8 @@ class GameOverState(GameState):
     def __init__(self, data: GameData) -> None:
         """Initialize this GameState.
         """
-        self._scores = []
-        for p in data.players:
-            goal_score, penalty = data.calculate_score(p.id)
-            self._scores.append((p.id, goal_score, penalty))
-
-        self._winner = max(self._scores, key=lambda item: item[1] - item[2])[0]
+        self._scores = final_scores(data)
+        self._winner = winner(self._scores)
 
     def process_event(self, event: pygame.event.Event) -> None:
         # Simply ignore the event
@@ -366,7 +278,7 @@ if __name__ == '__main__':
         'allowed-io': ['run_game'],
         'allowed-import-modules': [
             'doctest', 'python_ta', 'random', 'typing', 'pygame', '__future__',
-            'block', 'player', 'renderer', 'settings', 'actions'
+            'block', 'engine', 'player', 'renderer', 'settings', 'actions'
         ],
         'generated-members': 'pygame.*'
     })
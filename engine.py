@@ -0,0 +1,273 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains the game engine for Blocky: the data of a game, the rules
+for performing moves, and a loop that plays a whole game between computer
+players with no display.
+
+Nothing in this file uses pygame, so games can be played as fast as the
+players can choose their moves.
+"""
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from actions import ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE, \
+    SWAP_HORIZONTAL, SWAP_VERTICAL, SMASH, PASS, PAINT, COMBINE, ACTION_PENALTY
+from block import Block, Journal
+from goal import Goal, GoalState
+
+if TYPE_CHECKING:
+    from player import Player
+
+# A move as it is recorded in the history of a game: the ID of the player
+# who made it, the action, and the position and level of the block it was
+# made on.
+MoveRecord = Tuple[int, Tuple[str, Optional[int]], Tuple[int, int], int]
+
+
+def perform_action(block: Block, action: Tuple[str, Optional[int]],
+                   colour: Tuple[int, int, int],
+                   journal: Optional[Journal] = None) -> bool:
+    """Perform <action> on <block>, painting with <colour> if it is PAINT, and
+    record it in <journal> if one is given.
+
+    Return True iff the action was performed. PASS is always performed and
+    changes nothing.
+    """
+    direction = action[1]
+    if action in [ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE]:
+        return block.rotate(direction, journal)
+    elif action in [SWAP_HORIZONTAL, SWAP_VERTICAL]:
+        return block.swap(direction, journal)
+    elif action == SMASH:
+        return block.smash(journal)
+    elif action == PAINT:
+        return block.paint(colour, journal)
+    elif action == COMBINE:
+        return block.combine(journal)
+
+    return action == PASS
+
+
+class GameData:
+    """
+    A bundle of the data needed for a Blocky game.
+
+    === Public Attributes ===
+    max_turns:
+        The maximum number of turns for the game.
+    board:
+        The Blocky board on which this game will be played.
+    players:
+        The entities that are playing this game.
+    smashes:
+        The number of smashes done by each player.
+    combines:
+        The number of combines done by each player.
+    paints:
+        The number of paints done by each player.
+
+    === Representation Invariants ===
+    - len(players) >= 1
+    """
+    # === Private Attributes ===
+    # _states:
+    #   The GoalState shared by the goals of each kind, by the class of goal.
+    max_turns: int
+    board: Block
+    players: List[Player]
+    smashes: Dict[int, int]
+    combines: Dict[int, int]
+    paints: Dict[int, int]
+    _states: Dict[type, GoalState]
+
+    def __init__(self, board: Block, players: List[Player]) -> None:
+        """Initialize the game data, saving a reference to <board> and
+        <players>.
+
+        Precondition:
+            - len(players) >= 1
+        """
+        self.max_turns = 0
+        self.board = board
+        self.players = players
+
+        self.smashes = {}
+        self.combines = {}
+        self.paints = {}
+        self._states = {}
+
+        # Start off all counts at 0
+        for player in players:
+            self.smashes[player.id] = 0
+            self.combines[player.id] = 0
+            self.paints[player.id] = 0
+
+    def calculate_score(self, player_id: int) -> Tuple[int, int]:
+        """Return a tuple containing first the <player_id>'s score based on
+        their goal in the game and second the deductions from their score based
+        on the actions they've taken.
+        """
+        goal = self.players[player_id].goal
+        return self._state(goal).score(goal), self._penalty(player_id)
+
+    def calculate_scores(self) -> List[Tuple[int, int]]:
+        """Return calculate_score for every player, in the order of players.
+
+        The goals are grouped by kind, and each kind of goal scans the board
+        at most once for all the players that hold one, instead of once per
+        player.
+        """
+        by_kind = {}
+        for player in self.players:
+            by_kind.setdefault(type(player.goal), []).append(player)
+
+        goal_scores = {}
+        for players in by_kind.values():
+            goals = [player.goal for player in players]
+            for player, score in zip(players,
+                                     self._state(goals[0]).scores(goals)):
+                goal_scores[player.id] = score
+
+        return [(goal_scores[player.id], self._penalty(player.id))
+                for player in self.players]
+
+    def _penalty(self, player_id: int) -> int:
+        """Return the deductions from <player_id>'s score based on the actions
+        they've taken.
+        """
+        return self.smashes[player_id] * ACTION_PENALTY[SMASH] + \
+            self.combines[player_id] * ACTION_PENALTY[COMBINE] + \
+            self.paints[player_id] * ACTION_PENALTY[PAINT]
+
+    def block_changed(self, block: Block) -> None:
+        """Record that a Block operation on <block> may have changed any block
+        in the subtree rooted at <block>, so that scores can be brought up to
+        date by looking at that subtree only.
+        """
+        for state in self._states.values():
+            if state.board is self.board:
+                state.changed(block)
+
+    def _state(self, goal: Goal) -> GoalState:
+        """Return the GoalState for goals of the same kind as <goal> on the
+        current board.
+        """
+        state = self._states.get(type(goal))
+        if state is None or state.board is not self.board:
+            state = self._states[type(goal)] = goal.new_state(self.board)
+
+        return state
+
+
+def apply_move(data: GameData, player_id: int,
+               move: Tuple[str, Optional[int], Block]) -> bool:
+    """Attempt to make <move> for the player with <player_id>, counting the
+    actions that carry a penalty and keeping the scores in <data> up to date.
+
+    Return True iff the move was made.
+    """
+    action = (move[0], move[1])
+    block = move[2]
+    if not perform_action(block, action,
+                          data.players[player_id].goal.colour):
+        return False
+
+    if action == SMASH:
+        data.smashes[player_id] += 1
+    elif action == PAINT:
+        data.paints[player_id] += 1
+    elif action == COMBINE:
+        data.combines[player_id] += 1
+
+    if action != PASS:
+        data.block_changed(block)
+
+    return True
+
+
+def final_scores(data: GameData) -> List[Tuple[int, int, int]]:
+    """Return the ID, goal score and penalty of each player in <data>.
+    """
+    return [(p.id, goal_score, penalty) for p, (goal_score, penalty)
+            in zip(data.players, data.calculate_scores())]
+
+
+def winner(scores: List[Tuple[int, int, int]]) -> int:
+    """Return the ID of the winning player, given the <scores> returned by
+    final_scores.
+    """
+    return max(scores, key=lambda item: item[1] - item[2])[0]
+
+
+class GameResult:
+    """The outcome of a game played by play_game.
+
+    === Public Attributes ===
+    scores:
+        The ID, goal score and penalty of each player.
+    winner:
+        The ID of the winning player.
+    history:
+        Every move made in the game, in order.
+    """
+    scores: List[Tuple[int, int, int]]
+    winner: int
+    history: List[MoveRecord]
+
+    def __init__(self, scores: List[Tuple[int, int, int]],
+                 history: List[MoveRecord]) -> None:
+        """Initialize this result with the final <scores> and the <history>
+        of the game.
+        """
+        self.scores = scores
+        self.winner = winner(scores)
+        self.history = history
+
+
+def play_game(board: Block, players: List[Player],
+              num_turns: int) -> GameResult:
+    """Play a game of <num_turns> turns on <board> between <players>, and
+    return its result.
+
+    Each player is asked for a move in turn, exactly as in MainState, but
+    without waiting for a click or showing any animation. A player that
+    offers an invalid move is asked again.
+
+    Precondition:
+        - len(players) >= 1
+        - every player is a computer player, which makes a move as soon as
+          it is told to proceed
+    """
+    data = GameData(board, players)
+    data.max_turns = num_turns
+    history = []
+    for _ in range(num_turns):
+        for player in players:
+            while True:
+                player.proceed()
+                move = player.generate_move(board)
+                if move is not None and apply_move(data, player.id, move):
+                    break
+            history.append((player.id, (move[0], move[1]),
+                            move[2].position, move[2].level))
+
+    return GameResult(final_scores(data), history)
@@ -25,15 +25,26 @@ tests!
 """
 from typing import List, Optional, Tuple
 import os
+import random
+import subprocess
+import sys
 import pygame
 import pytest
 
-from block import Block
-from blocky import _block_to_squares
-from goal import BlobGoal, PerimeterGoal, _flatten
-from player import _get_block
+from arrayboard import ArrayBoard, generate_array_board, LEAF, PARENT
+from block import Block, Journal, generate_board
+from persistent import PersistentBoard
+from blocky import GameData, _block_to_squares
+from engine import play_game
+import goal
+from goal import BlobGoal, PerimeterGoal, BlobState, PerimeterState, \
+    _blob_sizes, _colour_grid, \
+    _flatten
+from player import Player, RandomPlayer, SmartPlayer, create_players, \
+    _get_block
 from renderer import Renderer
 from settings import COLOUR_LIST
+from tournament import make_configs, run_tournament
 
 
 def set_children(block: Block, colours: List[Optional[Tuple[int, int, int]]]) \
@@ -302,6 +313,27 @@ class TestGoal:
 
         assert result == flattened_board_16x16
 
+    def test_colour_grid(self, board_16x16, flattened_board_16x16) -> None:
+        """Test that the colour grid holds the index of each cell's colour.
+        """
+        grid = _colour_grid(board_16x16)
+
+        assert len(grid) == 4
+        for i in range(4):
+            for j in range(4):
+                assert COLOUR_LIST[grid[i][j]] == flattened_board_16x16[i][j]
+
+    def test_flatten_without_numpy(self, monkeypatch) -> None:
+        """Test that flattening gives the same result without NumPy.
+        """
+        random.seed(148)
+        board = generate_board(5, 750)
+        expected = _flatten(board)
+
+        monkeypatch.setattr(goal, 'numpy', None)
+        assert isinstance(_colour_grid(board)[0], bytearray)
+        assert _flatten(board) == expected
+
     def test_blob_goal(self, board_16x16) -> None:
         correct_scores = [
             (COLOUR_LIST[0], 1),
@@ -315,6 +347,38 @@ class TestGoal:
             goal = BlobGoal(colour)
             assert goal.score(board_16x16) == expected
 
+    def test_blob_sizes_match_flood_fill(self) -> None:
+        """Test that the largest blob of every colour found by labelling
+        matches the flood fill of _undiscovered_blob_size on random boards.
+        """
+        rng = random.Random(148)
+        for depth in range(1, 7):
+            random.seed(rng.random())
+            board = generate_board(depth, 750)
+            flattened = _flatten(board)
+            sizes = _blob_sizes(_colour_grid(board))
+            for i, colour in enumerate(COLOUR_LIST):
+                goal = BlobGoal(colour)
+                n = len(flattened)
+                visited = [[-1] * n for _ in range(n)]
+                expected = max(goal._undiscovered_blob_size((x, y), flattened,
+                                                            visited)
+                               for x in range(n) for y in range(n))
+                assert sizes[i] == expected
+                assert goal.score(board) == expected
+
+    def test_blob_goal_large_blob(self) -> None:
+        """Test that a blob far larger than the recursion limit is measured.
+        """
+        board = Block((0, 0), 750, None, 0, 8)
+        for child in board._new_children():
+            child.colour = COLOUR_LIST[1]
+        board.children[0].colour = COLOUR_LIST[2]
+
+        assert BlobGoal(COLOUR_LIST[1]).score(board) == 3 * 128 * 128
+        assert BlobGoal(COLOUR_LIST[2]).score(board) == 128 * 128
+        assert BlobGoal(COLOUR_LIST[0]).score(board) == 0
+
     def test_perimeter_goal(self, board_16x16):
         correct_scores = [
             (COLOUR_LIST[0], 2),
@@ -329,5 +393,487 @@ class TestGoal:
             assert goal.score(board_16x16) == expected
 
 
+    def test_perimeter_goal_matches_flatten(self) -> None:
+        """Test that PerimeterGoal matches counting the edges of the flattened
+        board on random boards up to depth 10.
+        """
+        rng = random.Random(148)
+        for depth in range(1, 11):
+            random.seed(rng.random())
+            board = generate_board(depth, 1024)
+            flattened = _flatten(board)
+            edges = flattened[0] + flattened[-1] + \
+                [column[0] for column in flattened] + \
+                [column[-1] for column in flattened]
+            for colour in COLOUR_LIST:
+                assert PerimeterGoal(colour).score(board) == edges.count(colour)
+
+
+class TestArrayBoard:
+    """A collection of methods for testing that ArrayBoard behaves exactly like
+    the Block tree it is converted from.
+    """
+    def test_round_trip(self, board_16x16) -> None:
+        """Test that converting the reference board to an ArrayBoard and back
+        results in an equal board.
+        """
+        board = ArrayBoard.from_block(board_16x16)
+
+        assert board.kind(0) == PARENT
+        assert board.colour(board.index_of([1])) == COLOUR_LIST[2]
+        assert board.to_block() == board_16x16
+
+    def test_generate_matches_block(self) -> None:
+        """Test that the same random seed generates the same board as
+        generate_board.
+        """
+        random.seed(148)
+        expected = generate_board(5, 750)
+        random.seed(148)
+        board = generate_array_board(5, 750)
+
+        assert board.to_block() == expected
+
+    def test_swap0(self, board_16x16, board_16x16_swap0) -> None:
+        board = ArrayBoard.from_block(board_16x16)
+
+        assert board.swap(0, 0)
+        assert board.to_block() == board_16x16_swap0
+
+    def test_rotate1(self, board_16x16, board_16x16_rotate1) -> None:
+        board = ArrayBoard.from_block(board_16x16)
+
+        assert board.rotate(board.index_of([0]), 1)
+        assert board.to_block() == board_16x16_rotate1
+
+    def test_smash_paint_combine(self, board_16x16) -> None:
+        """Test smash, paint and combine on the reference board against the
+        same operations on the Block tree.
+        """
+        board = ArrayBoard.from_block(board_16x16)
+        index = board.index_of([1])
+
+        random.seed(1)
+        board_16x16.children[1].smash()
+        random.seed(1)
+        assert board.smash(index)
+        assert board.to_block() == board_16x16
+
+        leaf = board.index_of([0, 0])
+        assert board.kind(leaf) == LEAF
+        assert not board.paint(leaf, COLOUR_LIST[0])
+        assert board.paint(leaf, COLOUR_LIST[1])
+        assert board.combine(board.index_of([0]))
+        assert board.colour(board.index_of([0])) == COLOUR_LIST[1]
+
+    def test_create_copy(self, board_16x16) -> None:
+        """Test that a copy is equal to, but independent of, the original.
+        """
+        board = ArrayBoard.from_block(board_16x16)
+        copy = board.create_copy()
+
+        assert copy == board
+        copy.swap(0, 1)
+        assert copy != board
+        assert board.to_block() == board_16x16
+
+    def test_random_moves(self) -> None:
+        """Test that random sequences of moves have the same effect on an
+        ArrayBoard and on a Block tree.
+        """
+        rng = random.Random(2020)
+        for _ in range(10):
+            tree = generate_board(4, 750)
+            board = ArrayBoard.from_block(tree)
+
+            for _ in range(50):
+                path = []
+                block = tree
+                while len(block.children) != 0 and rng.random() < 0.7:
+                    path.append(rng.randrange(4))
+                    block = block.children[path[-1]]
+                index = board.index_of(path)
+
+                action = rng.randrange(5)
+                if action == 0:
+                    state = random.getstate()
+                    expected = block.smash()
+                    random.setstate(state)
+                    assert board.smash(index) == expected
+                elif action == 1:
+                    direction = rng.choice([0, 1])
+                    assert board.swap(index, direction) == \
+                        block.swap(direction)
+                elif action == 2:
+                    direction = rng.choice([1, 3])
+                    assert board.rotate(index, direction) == \
+                        block.rotate(direction)
+                elif action == 3:
+                    colour = rng.choice(COLOUR_LIST)
+                    assert board.paint(index, colour) == block.paint(colour)
+                else:
+                    assert board.combine(index) == block.combine()
+
+                assert board.to_block() == tree
+
+
+class TestPersistentBoard:
+    """A collection of methods for testing that PersistentBoard behaves like
+    a Block tree while sharing the blocks that a move does not touch.
+    """
+    def test_round_trip(self, board_16x16) -> None:
+        board = PersistentBoard.from_block(board_16x16)
+
+        assert board.to_block() == board_16x16
+
+    def test_swap0(self, board_16x16, board_16x16_swap0) -> None:
+        board = PersistentBoard.from_block(board_16x16)
+        swapped = board.swap([], 0)
+
+        assert swapped.to_block() == board_16x16_swap0
+        # The original board is unchanged.
+        assert board.to_block() == board_16x16
+
+    def test_rotate1(self, board_16x16, board_16x16_rotate1) -> None:
+        board = PersistentBoard.from_block(board_16x16)
+
+        assert board.rotate([0], 1).to_block() == board_16x16_rotate1
+        assert board.rotate([1], 1) is None
+
+    def test_structural_sharing(self) -> None:
+        """Test that a move only copies the path to the block it acts on.
+        """
+        random.seed(7)
+        board = PersistentBoard.from_block(generate_board(6, 750))
+        if isinstance(board.node([0]), int):
+            board = board.smash([0])
+        moved = board.rotate([0], 1)
+
+        assert moved.node([0]) is not board.node([0])
+        for i in range(1, 4):
+            assert moved.node([i]) is board.node([i])
+
+    def test_random_moves(self) -> None:
+        """Test that random sequences of moves have the same effect on a
+        PersistentBoard and on a Block tree.
+        """
+        rng = random.Random(148)
+        for _ in range(10):
+            tree = generate_board(4, 750)
+            board = PersistentBoard.from_block(tree)
+
+            for _ in range(50):
+                path = []
+                block = tree
+                while len(block.children) != 0 and rng.random() < 0.7:
+                    path.append(rng.randrange(4))
+                    block = block.children[path[-1]]
+
+                action = rng.randrange(5)
+                if action == 0:
+                    state = random.getstate()
+                    expected = block.smash()
+                    random.setstate(state)
+                    result = board.smash(path)
+                elif action == 1:
+                    direction = rng.choice([0, 1])
+                    expected = block.swap(direction)
+                    result = board.swap(path, direction)
+                elif action == 2:
+                    direction = rng.choice([1, 3])
+                    expected = block.rotate(direction)
+                    result = board.rotate(path, direction)
+                elif action == 3:
+                    colour = rng.choice(COLOUR_LIST)
+                    expected = block.paint(colour)
+                    result = board.paint(path, colour)
+                else:
+                    expected = block.combine()
+                    result = board.combine(path)
+
+                assert (result is not None) == expected
+                board = result or board
+                assert board.to_block() == tree
+
+
+def _random_block(board: Block, rng: random.Random) -> Block:
+    """Return a block of <board> chosen by walking down from the root.
+    """
+    block = board
+    while len(block.children) != 0 and rng.random() < 0.7:
+        block = rng.choice(block.children)
+
+    return block
+
+
+def _random_move(block: Block, rng: random.Random,
+                 journal: Optional[Journal] = None) -> bool:
+    """Try a random operation on <block>, recording it in <journal>.
+
+    Return True iff the operation was performed.
+    """
+    action = rng.randrange(5)
+    if action == 0:
+        return block.smash(journal)
+    elif action == 1:
+        return block.swap(rng.choice([0, 1]), journal)
+    elif action == 2:
+        return block.rotate(rng.choice([1, 3]), journal)
+    elif action == 3:
+        return block.paint(rng.choice(COLOUR_LIST), journal)
+    else:
+        return block.combine(journal)
+
+
+class TestJournal:
+    """A collection of methods for testing that operations recorded in a
+    Journal can be undone exactly.
+    """
+    def test_undo_swap(self, board_16x16) -> None:
+        expected = board_16x16.create_copy()
+        journal = Journal()
+
+        assert board_16x16.swap(0, journal)
+        assert not board_16x16.children[0].swap(0, journal)
+        assert len(journal) == 1
+        assert journal.undo()
+        assert not journal.undo()
+        assert board_16x16 == expected
+
+    def test_undo_combine_restores_children(self, board_16x16) -> None:
+        """Test that undoing a combine brings back the very same children.
+        """
+        block = board_16x16.children[0]
+        children = block.children[:]
+        journal = Journal()
+
+        assert block.combine(journal)
+        journal.undo()
+        assert block.children == children
+        assert all(a is b for a, b in zip(block.children, children))
+
+    def test_nested_checkpoints(self) -> None:
+        """Test that rolling back to nested checkpoints restores the board as
+        it was at each checkpoint.
+        """
+        rng = random.Random(148)
+        random.seed(148)
+        board = generate_board(4, 750)
+        journal = Journal()
+
+        snapshots = []
+        for _ in range(5):
+            snapshots.append((journal.checkpoint(), board.create_copy()))
+            for _ in range(10):
+                _random_move(_random_block(board, rng), rng, journal)
+
+        for checkpoint, expected in reversed(snapshots):
+            journal.rollback(checkpoint)
+            assert board == expected
+        assert len(journal) == 0
+
+
+class TestZobristHash:
+    """A collection of methods for testing that the hash of a board is kept
+    up to date by every Block operation.
+    """
+    def test_equal_boards_equal_hashes(self, board_16x16,
+                                       board_16x16_rotate1) -> None:
+        assert hash(board_16x16) != hash(board_16x16_rotate1)
+
+        board_16x16.children[0].rotate(1)
+        assert hash(board_16x16) == hash(board_16x16_rotate1)
+        assert board_16x16 == board_16x16_rotate1
+
+    def test_rotate_back(self, board_16x16) -> None:
+        """Test that rotating a block and rotating it back restores the hash.
+        """
+        before = board_16x16.zobrist_hash()
+
+        board_16x16.children[0].rotate(1)
+        assert board_16x16.zobrist_hash() != before
+        board_16x16.children[0].rotate(3)
+        assert board_16x16.zobrist_hash() == before
+
+    def test_boards_as_keys(self, board_16x16) -> None:
+        seen = {board_16x16: 1}
+
+        assert board_16x16.create_copy() in seen
+
+    def test_children_assignment(self, board_16x16) -> None:
+        """Test that assigning new children makes the hash be computed again.
+        """
+        board_16x16.zobrist_hash()
+        set_children(board_16x16.children[1], COLOUR_LIST)
+
+        expected = board_16x16.create_copy()
+        expected.children = [child.create_copy()
+                             for child in board_16x16.children]
+        assert board_16x16.zobrist_hash() == expected.zobrist_hash()
+
+    def test_incremental(self) -> None:
+        """Test that the hash kept during random moves and undos is the hash
+        computed from scratch.
+        """
+        rng = random.Random(148)
+        random.seed(148)
+        board = generate_board(5, 750)
+        board.zobrist_hash()
+        journal = Journal()
+
+        for _ in range(300):
+            if rng.random() < 0.2:
+                journal.undo()
+            else:
+                _random_move(_random_block(board, rng), rng, journal)
+            assert board.zobrist_hash() == board._subtree_hash()
+
+
 if __name__ == '__main__':
     pytest.main(['example_tests.py'])
+
+
+class TestGoalState:
+    """A collection of methods for testing that goal states kept up to date
+    after each move score goals exactly as the goals themselves do.
+    """
+    def test_kinds_of_state(self, board_16x16) -> None:
+        assert isinstance(BlobGoal(COLOUR_LIST[0]).new_state(board_16x16),
+                          BlobState)
+        assert isinstance(
+            PerimeterGoal(COLOUR_LIST[0]).new_state(board_16x16),
+            PerimeterState)
+
+    def test_changed_after_random_moves(self) -> None:
+        rng = random.Random(148)
+        goals = [goal_class(colour) for goal_class in [BlobGoal, PerimeterGoal]
+                 for colour in COLOUR_LIST]
+        for depth in range(1, 6):
+            random.seed(rng.random())
+            board = generate_board(depth, 750)
+            states = {type(goal): goal.new_state(board) for goal in goals}
+            for goal in goals:
+                assert states[type(goal)].score(goal) == goal.score(board)
+
+            for _ in range(50):
+                block = _random_block(board, rng)
+                if _random_move(block, rng):
+                    for state in states.values():
+                        state.changed(block)
+                    expected = board.zobrist_hash()
+                    for goal in goals:
+                        assert states[type(goal)].score(goal) == \
+                            goal.score(board)
+                    # The states were up to date, so none was rebuilt.
+                    assert all(state._hash == expected
+                               for state in states.values())
+
+    def test_unreported_change(self, board_16x16) -> None:
+        """Test that a state notices a change it was not told about.
+        """
+        goal = BlobGoal(COLOUR_LIST[2])
+        state = goal.new_state(board_16x16)
+        assert state.score(goal) == 4
+
+        assert board_16x16.children[0].combine()
+        assert state.score(goal) == goal.score(board_16x16)
+
+
+class TestGameData:
+    """A collection of methods for testing the scores kept by GameData.
+    """
+    def test_calculate_scores(self, board_16x16) -> None:
+        goals = [BlobGoal(COLOUR_LIST[0]), PerimeterGoal(COLOUR_LIST[1]),
+                 BlobGoal(COLOUR_LIST[2]), PerimeterGoal(COLOUR_LIST[3])]
+        players = [Player(i, goal) for i, goal in enumerate(goals)]
+        data = GameData(board_16x16, players)
+        data.smashes[1] = 2
+
+        expected = [data.calculate_score(p.id) for p in players]
+        assert expected == [(1, 0), (5, 6), (4, 0), (5, 0)]
+        assert data.calculate_scores() == expected
+
+    def test_scores_follow_moves(self) -> None:
+        rng = random.Random(148)
+        random.seed(148)
+        board = generate_board(4, 750)
+        players = [Player(i, goal_class(colour)) for i, (goal_class, colour)
+                   in enumerate([(BlobGoal, COLOUR_LIST[0]),
+                                 (PerimeterGoal, COLOUR_LIST[0]),
+                                 (BlobGoal, COLOUR_LIST[3])])]
+        data = GameData(board, players)
+
+        for _ in range(30):
+            block = _random_block(board, rng)
+            if _random_move(block, rng):
+                data.block_changed(block)
+            assert data.calculate_scores() == \
+                [(p.goal.score(board), 0) for p in players]
+
+
+class TestEngine:
+    """A collection of methods for testing games played with no display.
+    """
+    def test_no_pygame(self) -> None:
+        """Test that the engine and the players do not import pygame.
+        """
+        code = 'import sys, engine, player; ' \
+               'assert "pygame" not in sys.modules'
+        subprocess.run([sys.executable, '-c', code], check=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+
+    def test_create_players(self) -> None:
+        random.seed(148)
+        players = create_players(1, 1, [3, 7])
+
+        assert [p.id for p in players] == [0, 1, 2, 3]
+        assert isinstance(players[1], RandomPlayer)
+        assert isinstance(players[2], SmartPlayer)
+        assert len({p.goal.colour for p in players}) == 4
+        assert len({type(p.goal) for p in players}) == 1
+
+    def test_computer_players_do_not_mutate(self) -> None:
+        random.seed(148)
+        board = generate_board(4, 750)
+        expected = board.create_copy()
+        for player in create_players(0, 1, [10]):
+            assert player.generate_move(board) is None
+            player.proceed()
+            move = player.generate_move(board)
+            assert move is not None
+            assert board == expected
+
+    def test_play_game(self) -> None:
+        random.seed(148)
+        board = generate_board(3, 750)
+        players = create_players(0, 2, [5])
+        result = play_game(board, players, 10)
+
+        assert len(result.history) == 30
+        assert [record[0] for record in result.history[:3]] == [0, 1, 2]
+        for (player_id, goal_score, _), player in zip(result.scores, players):
+            assert player_id == player.id
+            assert goal_score == player.goal.score(board)
+        assert result.winner in [0, 1, 2]
+
+
+class TestTournament:
+    """A collection of methods for testing the tournament runner.
+    """
+    def test_same_outcomes_with_more_processes(self) -> None:
+        configs = make_configs(6, [2, 3], [[None, 3], [2, 4, None]], 5)
+        alone = run_tournament(configs, 1)
+        pooled = run_tournament(configs, 2)
+
+        assert [o.scores for o in alone.outcomes] == \
+            [o.scores for o in pooled.outcomes]
+        assert [o.winner for o in alone.outcomes] == \
+            [o.winner for o in pooled.outcomes]
+
+    def test_win_rates(self) -> None:
+        result = run_tournament(make_configs(4, [2], [[1, 2]], 3), 1)
+        rates = result.win_rates()
+
+        assert set(rates) == {'Smart(1)', 'Smart(2)'}
+        assert sum(rates.values()) == 1.0
+        assert len(result.scores()['Smart(1)']) == 4
@@ -24,10 +24,28 @@ This file contains the hierarchy of Goal classes.
 from __future__ import annotations
 import math
 import random
-from typing import List, Tuple
+import re
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 from block import Block
 from settings import colour_name, COLOUR_LIST
 
+# NumPy is optional. Without it, colour grids are lists of bytearray columns.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# The index of each colour in COLOUR_LIST.
+_COLOUR_INDEX = {colour: i for i, colour in enumerate(COLOUR_LIST)}
+
+# A grid of COLOUR_LIST indices: a uint8 NumPy array if NumPy is installed,
+# otherwise a list of bytearray columns. Either way, grid[i][j] is the colour
+# index of the unit cell at column i and row j.
+ColourGrid = Union['numpy.ndarray', List[bytearray]]
+
+# Matches each run of equal bytes in a column of a colour grid.
+_RUN = re.compile(rb'(.)\1*', re.DOTALL)
+
 
 def generate_goals(num_goals: int) -> List[Goal]:
     """Return a randomly generated list of goals with length num_goals.
@@ -39,8 +57,103 @@ def generate_goals(num_goals: int) -> List[Goal]:
     Precondition:
         - num_goals <= len(COLOUR_LIST)
     """
-    # TODO: Implement Me
-    return [PerimeterGoal(COLOUR_LIST[0])]  # FIXME
+    goal_class = random.choice([PerimeterGoal, BlobGoal])
+    return [goal_class(colour)
+            for colour in random.sample(COLOUR_LIST, num_goals)]
+
+
+def _cell_leaves(block: Block) -> Iterator[Tuple[int, int, int, int]]:
+    """Yield (column, row, width, colour index) for each leaf of <block>, in
+    units of cells at max_depth relative to the upper left corner of <block>.
+    """
+    stack = [(block, 0, 0, 2 ** (block.max_depth - block.level))]
+    while len(stack) != 0:
+        b, x, y, width = stack.pop()
+        if len(b.children) == 0:
+            yield x, y, width, _COLOUR_INDEX[b.colour]
+        else:
+            half = width // 2
+            c = b.children
+            stack.append((c[0], x + half, y, half))
+            stack.append((c[1], x, y, half))
+            stack.append((c[2], x, y + half, half))
+            stack.append((c[3], x + half, y + half, half))
+
+
+def _edge_leaves(block: Block, x: int, y: int, width: int, n: int) \
+        -> Iterator[Tuple[int, int, int, int]]:
+    """Yield (column, row, width, colour index) for each leaf of <block> that
+    lies on an edge of a board that is <n> unit cells wide, where <block> is
+    <width> cells wide with its upper left cell at column <x> and row <y>.
+
+    Only the blocks that touch an edge of the board are visited.
+    """
+    stack = [(block, x, y, width)]
+    while len(stack) != 0:
+        b, x, y, width = stack.pop()
+        if len(b.children) == 0:
+            yield x, y, width, _COLOUR_INDEX[b.colour]
+        else:
+            half = width // 2
+            c = b.children
+            for child, cx, cy in ((c[0], x + half, y), (c[1], x, y),
+                                  (c[2], x, y + half),
+                                  (c[3], x + half, y + half)):
+                if cx == 0 or cy == 0 or cx + half == n or cy + half == n:
+                    stack.append((child, cx, cy, half))
+
+
+def _block_cells(board: Block, block: Block) \
+        -> List[Tuple[Block, int, int, int]]:
+    """Return (block, column, row, width) for each block from <board> down to
+    <block>, in units of cells at max_depth relative to the upper left corner
+    of <board>.
+
+    Precondition: <block> is <board> or one of its descendants.
+    """
+    width = 2 ** (board.max_depth - board.level)
+    x, y = 0, 0
+    b = board
+    result = [(b, x, y, width)]
+    while b.level < block.level:
+        width //= 2
+        c = b.children
+        right = block.position[0] >= c[0].position[0]
+        down = block.position[1] >= c[2].position[1]
+        b = c[(1, 0, 2, 3)[right + 2 * down]]
+        x += width * right
+        y += width * down
+        result.append((b, x, y, width))
+
+    return result
+
+
+def _colour_grid(block: Block) -> ColourGrid:
+    """Return <block> as a grid of unit cells, each holding the index in
+    COLOUR_LIST of the colour of the block at that cell.
+
+    The grid has 2^{max_depth - block.level} columns of that many cells, and
+    grid[i][j] is the unit cell at column i and row j, as in _flatten. Each
+    leaf is filled with slice assignments rather than cell by cell.
+
+    >>> b = Block((0, 0), 750, COLOUR_LIST[2], 0, 1)
+    >>> [[int(cell) for cell in column] for column in _colour_grid(b)]
+    [[2, 2], [2, 2]]
+    """
+    n = 2 ** (block.max_depth - block.level)
+
+    if numpy is not None:
+        grid = numpy.zeros((n, n), dtype=numpy.uint8)
+        for x, y, width, colour in _cell_leaves(block):
+            grid[x:x + width, y:y + width] = colour
+    else:
+        grid = [bytearray(n) for _ in range(n)]
+        for x, y, width, colour in _cell_leaves(block):
+            run = bytes((colour,)) * width
+            for column in grid[x:x + width]:
+                column[y:y + width] = run
+
+    return grid
 
 
 def _flatten(block: Block) -> List[List[Tuple[int, int, int]]]:
@@ -56,9 +169,186 @@ def _flatten(block: Block) -> List[List[Tuple[int, int, int]]]:
     of the block at the cell location[i][j]
 
     L[0][0] represents the unit cell in the upper left corner of the Block.
+
+    This is built from _colour_grid, which is what the goals use directly.
+    """
+    grid = _colour_grid(block)
+    if numpy is not None:
+        palette = numpy.empty(len(COLOUR_LIST), dtype=object)
+        palette[:] = COLOUR_LIST
+        return palette[grid].tolist()
+
+    return [list(map(COLOUR_LIST.__getitem__, column)) for column in grid]
+
+
+def _blob_sizes(grid: ColourGrid) -> List[int]:
+    """Return the size of the largest blob of each colour in <grid>, in the
+    order of COLOUR_LIST. The size is 0 for colours that are not in <grid>.
+
+    A blob is a set of cells of the same colour connected through their
+    sides. The grid is labelled in a single pass over its columns: each run of
+    equal cells in a column is a node of a union-find structure, and it is
+    joined with every run of the same colour beside it in the previous column.
+    No recursion is used, so blobs of any size can be measured.
+
+    >>> _blob_sizes([bytearray([0, 1]), bytearray([0, 0])])
+    [3, 1, 0, 0]
+    """
+    # The union-find parent, size and colour of each run, by run number.
+    parents = []
+    sizes = []
+    colours = []
+
+    def find(run: int) -> int:
+        while parents[run] != run:
+            parents[run] = parents[parents[run]]
+            run = parents[run]
+        return run
+
+    # The (start, end, run number) of each run in the previous column.
+    previous = []
+    for column in grid:
+        current = []
+        p = 0
+        for match in _RUN.finditer(bytes(column)):
+            start, end = match.span()
+            colour = column[start]
+            run = len(parents)
+            parents.append(run)
+            sizes.append(end - start)
+            colours.append(colour)
+            current.append((start, end, run))
+
+            # Join the runs of the previous column that overlap this one.
+            while p < len(previous) and previous[p][1] <= start:
+                p += 1
+            q = p
+            while q < len(previous) and previous[q][0] < end:
+                other = previous[q][2]
+                if colours[other] == colour:
+                    a, b = find(run), find(other)
+                    if a != b:
+                        if sizes[a] < sizes[b]:
+                            a, b = b, a
+                        parents[b] = a
+                        sizes[a] += sizes[b]
+                q += 1
+        previous = current
+
+    largest = [0] * len(COLOUR_LIST)
+    for run, parent in enumerate(parents):
+        if parent == run and sizes[run] > largest[colours[run]]:
+            largest[colours[run]] = sizes[run]
+
+    return largest
+
+
+def _leaf_summary(colour: int, width: int) -> tuple:
+    """Return the blob summary of a leaf of colour index <colour> that is
+    <width> unit cells wide.
+
+    A blob summary of a square of cells is a tuple (closed, sizes, colours,
+    top, bottom, left, right), where:
+        - closed[c] is the size of the largest blob of colour index c that
+          does not touch the edge of the square.
+        - the blobs that touch the edge are labelled 0, 1, 2, ..., and label i
+          has sizes[i] cells of colour index colours[i].
+        - top and bottom hold the label of each cell along the top and bottom
+          edge, by column, and left and right hold the label of each cell
+          along the left and right edge, by row.
+    """
+    edge = [0] * width
+    return [0] * len(COLOUR_LIST), [width * width], [colour], edge, edge, \
+        edge, edge
+
+
+def _merge_summaries(summaries: List[tuple]) -> tuple:
+    """Return the blob summary of a square made of the four squares with the
+    given <summaries>, in the order of Block.children.
+
+    This takes time proportional to the width of the square.
+    """
+    sizes = []
+    colours = []
+    bases = []
+    closed = [0] * len(COLOUR_LIST)
+    for summary in summaries:
+        bases.append(len(sizes))
+        sizes.extend(summary[1])
+        colours.extend(summary[2])
+        closed = list(map(max, closed, summary[0]))
+    parents = list(range(len(sizes)))
+
+    def find(label: int) -> int:
+        while parents[label] != label:
+            parents[label] = parents[parents[label]]
+            label = parents[label]
+        return label
+
+    def join(edge: List[int], base: int, other: List[int],
+             other_base: int) -> None:
+        # Join the blobs on either side of a seam between two squares.
+        last = None
+        for pair in zip(edge, other):
+            if pair != last:
+                last = pair
+                a, b = find(pair[0] + base), find(pair[1] + other_base)
+                if a != b and colours[a] == colours[b]:
+                    if sizes[a] < sizes[b]:
+                        a, b = b, a
+                    parents[b] = a
+                    sizes[a] += sizes[b]
+
+    ur, ul, ll, lr = summaries
+    b_ur, b_ul, b_ll, b_lr = bases
+    join(ul[6], b_ul, ur[5], b_ur)
+    join(ll[6], b_ll, lr[5], b_lr)
+    join(ul[4], b_ul, ll[3], b_ll)
+    join(ur[4], b_ur, lr[3], b_lr)
+
+    # Label the blobs that still touch the edge, in order of appearance.
+    labels = {}
+    new_sizes = []
+    new_colours = []
+
+    def relabel(edge: List[int], base: int) -> List[int]:
+        result = []
+        last = new = None
+        for label in edge:
+            if label != last:
+                last = label
+                root = find(label + base)
+                new = labels.get(root)
+                if new is None:
+                    new = labels[root] = len(new_sizes)
+                    new_sizes.append(sizes[root])
+                    new_colours.append(colours[root])
+            result.append(new)
+        return result
+
+    top = relabel(ul[3], b_ul) + relabel(ur[3], b_ur)
+    bottom = relabel(ll[4], b_ll) + relabel(lr[4], b_lr)
+    left = relabel(ul[5], b_ul) + relabel(ll[5], b_ll)
+    right = relabel(ur[6], b_ur) + relabel(lr[6], b_lr)
+
+    for label, parent in enumerate(parents):
+        if parent == label and label not in labels and \
+                sizes[label] > closed[colours[label]]:
+            closed[colours[label]] = sizes[label]
+
+    return closed, new_sizes, new_colours, top, bottom, left, right
+
+
+def _summary_largest(summary: tuple) -> List[int]:
+    """Return the size of the largest blob of each colour in the square with
+    the blob <summary>, in the order of COLOUR_LIST.
     """
-    # TODO: Implement me
-    return []  # FIXME
+    largest = list(summary[0])
+    for size, colour in zip(summary[1], summary[2]):
+        if size > largest[colour]:
+            largest[colour] = size
+
+    return largest
 
 
 class Goal:
@@ -90,21 +380,59 @@ class Goal:
         """
         raise NotImplementedError
 
+    def new_state(self, board: Block) -> GoalState:
+        """Return a new GoalState for scoring goals of this kind on <board>.
+
+        The state can be shared by every goal of the same kind.
+        """
+        return GoalState(board)
+
 
 class PerimeterGoal(Goal):
+    """A goal to put the most possible units of this goal's target colour on
+    the outer perimeter of the board.
+    """
+
     def score(self, board: Block) -> int:
-        # TODO: Implement me
-        return 148  # FIXME
+        """Return the number of unit cells of this goal's colour on the outer
+        perimeter of <board>, where each corner cell counts twice.
+
+        Only the blocks that touch an edge of <board> are visited, so the
+        board is never flattened.
+        """
+        n = 2 ** (board.max_depth - board.level)
+        total = 0
+        for x, y, width, colour in _edge_leaves(board, 0, 0, n, n):
+            if COLOUR_LIST[colour] == self.colour:
+                # One unit per cell along each edge this leaf lies on.
+                edges = (x == 0) + (y == 0) + (x + width == n) + \
+                    (y + width == n)
+                total += edges * width
+
+        return total
 
     def description(self) -> str:
-        # TODO: Implement me
-        return 'DESCRIPTION'  # FIXME
+        """Return a description of this goal.
+        """
+        return f'Put the most units of {colour_name(self.colour)} on the ' \
+               f'outer perimeter'
+
+    def new_state(self, board: Block) -> GoalState:
+        """Return a new PerimeterState for <board>.
+        """
+        return PerimeterState(board)
 
 
 class BlobGoal(Goal):
+    """A goal to create the largest connected blob of this goal's target
+    colour, anywhere within the Block.
+    """
+
     def score(self, board: Block) -> int:
-        # TODO: Implement me
-        return 148  # FIXME
+        """Return the number of unit cells in the largest blob of this goal's
+        colour on <board>.
+        """
+        return _blob_sizes(_colour_grid(board))[_COLOUR_INDEX[self.colour]]
 
     def _undiscovered_blob_size(self, pos: Tuple[int, int],
                                 board: List[List[Tuple[int, int, int]]],
@@ -125,13 +453,259 @@ class BlobGoal(Goal):
 
         Update <visited> so that all cells that are visited are marked with
         either 0 or 1.
+
+        The search keeps its own stack, so it is not limited by the recursion
+        limit however large the blob is.
         """
-        # TODO: Implement me
-        pass  # FIXME
+        n = len(board)
+        size = 0
+        stack = [pos]
+        while len(stack) != 0:
+            i, j = stack.pop()
+            if 0 <= i < n and 0 <= j < n and visited[i][j] == -1:
+                if board[i][j] == self.colour:
+                    visited[i][j] = 1
+                    size += 1
+                    stack.extend([(i + 1, j), (i - 1, j),
+                                  (i, j + 1), (i, j - 1)])
+                else:
+                    visited[i][j] = 0
+
+        return size
 
     def description(self) -> str:
-        # TODO: Implement me
-        return 'DESCRIPTION'  # FIXME
+        """Return a description of this goal.
+        """
+        return f'Create the largest connected blob of ' \
+               f'{colour_name(self.colour)}'
+
+    def new_state(self, board: Block) -> GoalState:
+        """Return a new BlobState for <board>.
+        """
+        return BlobState(board)
+
+
+class GoalState:
+    """The information a kind of goal keeps about a board so that, after a
+    move, goals can be scored in time proportional to what the move changed.
+
+    A GoalState is brought up to date by calling changed after each Block
+    operation on the board. If the board was changed without telling the
+    state, this is noticed from the Zobrist hash of the board and the state is
+    built again from scratch.
+
+    This class keeps no information and scores each goal from scratch.
+
+    === Public Attributes ===
+    board:
+        The board that this state is about.
+    """
+    # === Private Attributes ===
+    # _hash:
+    #   The Zobrist hash of the board when this state was last brought up to
+    #   date, or None if it has not been built yet.
+    board: Block
+    _hash: Optional[int]
+
+    def __init__(self, board: Block) -> None:
+        """Initialize this state for <board>. It is built when it is first
+        needed.
+        """
+        self.board = board
+        self._hash = None
+
+    def changed(self, block: Block) -> None:
+        """Update this state after a Block operation on <block>, which may
+        have changed any block in the subtree rooted at <block>, but no other
+        block of the board.
+
+        Precondition: <block> is part of this state's board, and the board has
+        not been changed in any other way since the state was last updated.
+        """
+        if self._hash is not None:
+            self._update(_block_cells(self.board, block))
+            self._hash = self.board.zobrist_hash()
+
+    def score(self, goal: Goal) -> int:
+        """Return the score of <goal> on this state's board.
+
+        Precondition: <goal> is of the kind of goal this state is for.
+        """
+        return self.scores([goal])[0]
+
+    def scores(self, goals: List[Goal]) -> List[int]:
+        """Return the score of each of <goals> on this state's board, bringing
+        this state up to date at most once for all of them.
+
+        Precondition: each of <goals> is of the kind of goal this state is for.
+        """
+        if self._hash != self.board.zobrist_hash():
+            self._rebuild()
+            self._hash = self.board.zobrist_hash()
+
+        return [self._score(goal) for goal in goals]
+
+    def _rebuild(self) -> None:
+        """Build this state from scratch.
+        """
+
+    def _update(self, cells: List[Tuple[Block, int, int, int]]) -> None:
+        """Update this state after a change to the last of the blocks in
+        <cells>, as returned by _block_cells.
+        """
+
+    def _score(self, goal: Goal) -> int:
+        """Return the score of <goal> using this state.
+        """
+        return goal.score(self.board)
+
+
+class PerimeterState(GoalState):
+    """The colours of the cells along the perimeter of a board, for scoring
+    any PerimeterGoal.
+    """
+    # === Private Attributes ===
+    # _edges:
+    #   The colour index of each cell along the top, bottom, left and right
+    #   edge of the board. The top and bottom edges are by column, the left
+    #   and right edges by row.
+    # _counts:
+    #   The number of edge cells of each colour index, where corner cells are
+    #   counted once for each edge they are on.
+    _edges: List[bytearray]
+    _counts: List[int]
+
+    def _rebuild(self) -> None:
+        """Build this state from scratch.
+        """
+        n = 2 ** (self.board.max_depth - self.board.level)
+        self._edges = [bytearray(n) for _ in range(4)]
+        self._fill(self.board, 0, 0, n)
+        self._counts = [sum(edge.count(i) for edge in self._edges)
+                        for i in range(len(COLOUR_LIST))]
+
+    def _update(self, cells: List[Tuple[Block, int, int, int]]) -> None:
+        """Update the edge cells that lie within the changed block.
+        """
+        block, x, y, width = cells[-1]
+        n = len(self._edges[0])
+        top, bottom, left, right = self._edges
+        spans = []
+        if y == 0:
+            spans.append((top, x))
+        if y + width == n:
+            spans.append((bottom, x))
+        if x == 0:
+            spans.append((left, y))
+        if x + width == n:
+            spans.append((right, y))
+
+        for edge, start in spans:
+            for i in range(len(COLOUR_LIST)):
+                self._counts[i] -= edge.count(i, start, start + width)
+        self._fill(block, x, y, width)
+        for edge, start in spans:
+            for i in range(len(COLOUR_LIST)):
+                self._counts[i] += edge.count(i, start, start + width)
+
+    def _fill(self, block: Block, x: int, y: int, width: int) -> None:
+        """Write the colour of each edge cell of <block>, which is <width>
+        cells wide with its upper left cell at column <x> and row <y>, into
+        the edges.
+        """
+        n = len(self._edges[0])
+        top, bottom, left, right = self._edges
+        for lx, ly, lw, colour in _edge_leaves(block, x, y, width, n):
+            run = bytes((colour,)) * lw
+            if ly == 0:
+                top[lx:lx + lw] = run
+            if ly + lw == n:
+                bottom[lx:lx + lw] = run
+            if lx == 0:
+                left[ly:ly + lw] = run
+            if lx + lw == n:
+                right[ly:ly + lw] = run
+
+    def _score(self, goal: Goal) -> int:
+        """Return the number of edge cells of the colour of <goal>, corners
+        counted twice.
+        """
+        return self._counts[_COLOUR_INDEX[goal.colour]]
+
+
+class BlobState(GoalState):
+    """A blob summary of every parent block of a board, for scoring any
+    BlobGoal.
+
+    The summary of a block describes the blobs that touch its edge and the
+    largest blob of each colour inside it, so that the summary of a parent
+    can be found from those of its children alone. After a move, only the
+    changed block and its ancestors are summarized again.
+    """
+    # === Private Attributes ===
+    # _summaries:
+    #   The blob summary of each parent block of the board, by its (column,
+    #   row, width) in unit cells. Entries for blocks that no longer exist are
+    #   never read.
+    # _largest:
+    #   The size of the largest blob of each colour index on the board.
+    _summaries: Dict[Tuple[int, int, int], tuple]
+    _largest: List[int]
+
+    def _rebuild(self) -> None:
+        """Build this state from scratch.
+        """
+        self._summaries = {}
+        n = 2 ** (self.board.max_depth - self.board.level)
+        self._largest = _summary_largest(
+            self._summarize(self.board, 0, 0, n))
+
+    def _update(self, cells: List[Tuple[Block, int, int, int]]) -> None:
+        """Summarize the changed block and then each of its ancestors.
+        """
+        summary = self._summarize(*cells[-1])
+        for block, x, y, width in reversed(cells[:-1]):
+            half = width // 2
+            c = block.children
+            summary = _merge_summaries([
+                self._summary(c[0], x + half, y, half),
+                self._summary(c[1], x, y, half),
+                self._summary(c[2], x, y + half, half),
+                self._summary(c[3], x + half, y + half, half)])
+            self._summaries[(x, y, width)] = summary
+        self._largest = _summary_largest(summary)
+
+    def _summary(self, block: Block, x: int, y: int, width: int) -> tuple:
+        """Return the stored blob summary of <block>, which is <width> cells
+        wide with its upper left cell at column <x> and row <y>.
+        """
+        if len(block.children) == 0:
+            return _leaf_summary(_COLOUR_INDEX[block.colour], width)
+
+        return self._summaries[(x, y, width)]
+
+    def _summarize(self, block: Block, x: int, y: int, width: int) -> tuple:
+        """Summarize <block> and all of its descendants again, store the
+        summaries of the parents, and return the summary of <block>.
+        """
+        if len(block.children) == 0:
+            return _leaf_summary(_COLOUR_INDEX[block.colour], width)
+
+        half = width // 2
+        c = block.children
+        summary = _merge_summaries([
+            self._summarize(c[0], x + half, y, half),
+            self._summarize(c[1], x, y, half),
+            self._summarize(c[2], x, y + half, half),
+            self._summarize(c[3], x + half, y + half, half)])
+        self._summaries[(x, y, width)] = summary
+
+        return summary
+
+    def _score(self, goal: Goal) -> int:
+        """Return the size of the largest blob of the colour of <goal>.
+        """
+        return self._largest[_COLOUR_INDEX[goal.colour]]
 
 
 if __name__ == '__main__':
@@ -139,7 +713,7 @@ if __name__ == '__main__':
     python_ta.check_all(config={
         'allowed-import-modules': [
             'doctest', 'python_ta', 'random', 'typing', 'block', 'settings',
-            'math', '__future__'
+            'math', '__future__', 'numpy'
         ],
         'max-attributes': 15
     })
@@ -0,0 +1,306 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains the PersistentBoard class, an immutable board for search.
+
+A PersistentBoard is never changed. Each operation returns a new board that
+shares every untouched subtree with the old one, so trying a move costs time
+proportional to the depth of the board rather than its size, and copying a
+board costs nothing at all.
+
+Nodes are plain values:
+    - a leaf is the index of its colour in COLOUR_LIST.
+    - a parent is a tuple (turn, c0, c1, c2, c3) of its stored children and
+      the number of clockwise quarter turns that still have to be applied to
+      them. Rotating a block therefore only changes its turn, no matter how
+      large the block is.
+
+Blocks are identified by their path: the list of child indices, in the order
+of Block.children, that leads from the root to the block.
+"""
+from __future__ import annotations
+from typing import Callable, List, Optional, Tuple, Union
+import random
+import math
+
+from block import Block, _majority_colour
+from settings import COLOUR_LIST
+
+# A leaf colour index, or a (turn, c0, c1, c2, c3) parent tuple.
+Node = Union[int, tuple]
+
+# The colour indices that a leaf may hold, in the order of COLOUR_LIST.
+_COLOUR_INDICES = list(range(len(COLOUR_LIST)))
+
+# The new order of the children for each swap direction, as in Block.swap.
+_SWAPS = {0: (1, 0, 3, 2), 1: (3, 2, 1, 0)}
+
+
+def _child(node: tuple, rotation: int, i: int) -> Tuple[Node, int]:
+    """Return child <i> of the parent <node>, which is seen with <rotation>
+    extra clockwise quarter turns, along with the rotation the child is seen
+    with.
+    """
+    turn = (rotation + node[0]) % 4
+    return node[1 + (i + turn) % 4], turn
+
+
+def _random_children(level: int, max_depth: int) -> tuple:
+    """Return the stored children for a block at <level> that has just been
+    smashed, consuming the random module exactly as Block.smash does.
+    """
+    level += 1
+    children = []
+    for _ in range(4):
+        if level < max_depth and random.random() < math.exp(-0.25 * level):
+            children.append((0,) + _random_children(level, max_depth))
+        else:
+            children.append(random.choice(_COLOUR_INDICES))
+
+    return tuple(children)
+
+
+def _from_block(block: Block) -> Node:
+    """Return the node with the same blocks as <block>.
+    """
+    if len(block.children) == 0:
+        return COLOUR_LIST.index(block.colour)
+
+    return (0,) + tuple(_from_block(child) for child in block.children)
+
+
+def _load(node: Node, rotation: int, block: Block) -> None:
+    """Give <block>, a new Block with no colour, the colour or the children of
+    <node> seen with <rotation>.
+    """
+    if isinstance(node, int):
+        block.colour = COLOUR_LIST[node]
+    else:
+        for i, child in enumerate(block._new_children()):
+            child_node, turn = _child(node, rotation, i)
+            _load(child_node, turn, child)
+
+
+def _same(node: Node, rotation: int, other: Node, other_rotation: int) -> bool:
+    """Return True iff <node> seen with <rotation> has the same blocks as
+    <other> seen with <other_rotation>.
+    """
+    if isinstance(node, int) or isinstance(other, int):
+        return node == other
+
+    for i in range(4):
+        child, turn = _child(node, rotation, i)
+        other_child, other_turn = _child(other, other_rotation, i)
+        if not _same(child, turn, other_child, other_turn):
+            return False
+
+    return True
+
+
+class PersistentBoard:
+    """An immutable Blocky board whose operations return new boards.
+
+    === Public Attributes ===
+    max_depth:
+        The deepest level allowed in this board.
+    size:
+        The height and width of the board.
+    position:
+        The (x, y) coordinates of the upper left corner of the board.
+    root:
+        The node at the root of the board.
+
+    === Representation Invariants ===
+    - Only nodes at a level below max_depth are parents.
+    - Every turn stored in a parent is 0, 1, 2 or 3.
+    """
+    max_depth: int
+    size: int
+    position: Tuple[int, int]
+    root: Node
+
+    def __init__(self, max_depth: int, size: int, root: Node,
+                 position: Tuple[int, int] = (0, 0)) -> None:
+        """Initialize this board with the given <root> node, a depth of
+        <max_depth> and dimensions of <size> by <size> at <position>.
+        """
+        self.max_depth = max_depth
+        self.size = size
+        self.position = position
+        self.root = root
+
+    def __eq__(self, other: PersistentBoard) -> bool:
+        """Return True iff this board and <other> have the same dimensions and
+        the same blocks, however their rotations happen to be stored.
+        """
+        return self.max_depth == other.max_depth and \
+            self.size == other.size and \
+            self.position == other.position and \
+            _same(self.root, 0, other.root, 0)
+
+    @staticmethod
+    def from_block(block: Block) -> PersistentBoard:
+        """Return a new PersistentBoard with the same blocks as <block>.
+
+        Precondition: <block> is the root of a board, i.e. its level is 0.
+        """
+        return PersistentBoard(block.max_depth, block.size,
+                               _from_block(block), block.position)
+
+    def to_block(self) -> Block:
+        """Return a new Block tree with the same blocks as this board.
+        """
+        block = Block(self.position, self.size, None, 0, self.max_depth)
+        _load(self.root, 0, block)
+
+        return block
+
+    def create_copy(self) -> PersistentBoard:
+        """Return a copy of this board.
+
+        Since boards are never changed, the copy is this board itself.
+        """
+        return self
+
+    def node(self, path: List[int]) -> Node:
+        """Return the node of the block at <path>.
+
+        Precondition: each block along <path> except the last is a parent.
+        """
+        node, rotation = self.root, 0
+        for i in path:
+            node, rotation = _child(node, rotation, i)
+
+        return node
+
+    def _update(self, path: List[int],
+                update: Callable[[Node, int, int], Optional[Node]]) \
+            -> Optional[PersistentBoard]:
+        """Return a new board in which the node at <path> is replaced by the
+        result of calling <update> with that node, the rotation it is seen
+        with and its level, or None if <update> returns None.
+
+        Only the nodes along <path> are copied.
+        """
+        ancestors = []
+        node, rotation = self.root, 0
+        for i in path:
+            ancestors.append((node, rotation, i))
+            node, rotation = _child(node, rotation, i)
+
+        new_node = update(node, rotation, len(path))
+        if new_node is None:
+            return None
+
+        for parent, parent_rotation, i in reversed(ancestors):
+            slot = 1 + (i + parent_rotation + parent[0]) % 4
+            new_node = parent[:slot] + (new_node,) + parent[slot + 1:]
+
+        return PersistentBoard(self.max_depth, self.size, new_node,
+                               self.position)
+
+    def smash(self, path: List[int]) -> Optional[PersistentBoard]:
+        """Return a new board in which the block at <path> has been smashed,
+        exactly as Block.smash would, or None if it cannot be smashed.
+        """
+        def update(node: Node, rotation: int, level: int) -> Optional[Node]:
+            if not isinstance(node, int) or level == self.max_depth:
+                return None
+            # Undo the rotation the new block is seen with, so that its
+            # children end up in the order they were generated in.
+            return ((-rotation) % 4,) + \
+                _random_children(level, self.max_depth)
+
+        return self._update(path, update)
+
+    def swap(self, path: List[int], direction: int) \
+            -> Optional[PersistentBoard]:
+        """Return a new board in which the children of the block at <path>
+        have been swapped horizontally if <direction> is 0, or vertically if
+        <direction> is 1, or None if the block has no children.
+
+        Precondition: <direction> is either 0 or 1
+        """
+        order = _SWAPS[direction]
+
+        def update(node: Node, rotation: int, _: int) -> Optional[Node]:
+            if isinstance(node, int):
+                return None
+            turn = (rotation + node[0]) % 4
+            children = [None] * 4
+            for i in range(4):
+                children[(i + turn) % 4] = node[1 + (order[i] + turn) % 4]
+            return (node[0],) + tuple(children)
+
+        return self._update(path, update)
+
+    def rotate(self, path: List[int], direction: int) \
+            -> Optional[PersistentBoard]:
+        """Return a new board in which the block at <path> has been rotated
+        clockwise if <direction> is 1, or counter-clockwise if <direction> is
+        3, or None if the block has no children.
+
+        Precondition: <direction> is either 1 or 3.
+        """
+        def update(node: Node, _: int, __: int) -> Optional[Node]:
+            if isinstance(node, int):
+                return None
+            return ((node[0] + direction) % 4,) + node[1:]
+
+        return self._update(path, update)
+
+    def paint(self, path: List[int], colour: Tuple[int, int, int]) \
+            -> Optional[PersistentBoard]:
+        """Return a new board in which the block at <path> has been painted
+        <colour>, or None if it is not a leaf at max_depth of another colour.
+        """
+        colour_index = COLOUR_LIST.index(colour)
+
+        def update(node: Node, _: int, level: int) -> Optional[Node]:
+            if level != self.max_depth or node == colour_index:
+                return None
+            return colour_index
+
+        return self._update(path, update)
+
+    def combine(self, path: List[int]) -> Optional[PersistentBoard]:
+        """Return a new board in which the block at <path> has been turned into
+        a leaf of the majority colour of its children, following the same rules
+        as Block.combine, or None if it cannot be combined.
+        """
+        def update(node: Node, _: int, level: int) -> Optional[Node]:
+            if isinstance(node, int) or level != self.max_depth - 1:
+                return None
+            # The order of the children does not affect the majority.
+            return _majority_colour(list(node[1:]))
+
+        return self._update(path, update)
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'random', 'typing', '__future__', 'math',
+            'block', 'settings'
+        ],
+        'max-attributes': 15
+    })
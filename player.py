@@ -20,18 +20,32 @@ Misha Schwartz, and Jaisie Sin.
 === Module Description ===
 
 This file contains the hierarchy of player classes.
+
+pygame is only imported by the methods that handle pygame events and the
+mouse, so that computer players can play games with no display.
 """
 from __future__ import annotations
-from typing import List, Optional, Tuple
+from typing import TYPE_CHECKING, List, Optional, Tuple
 import random
-import pygame
 
-from block import Block
+from block import Block, Journal
+from engine import perform_action
 from goal import Goal, generate_goals
 
 from actions import KEY_ACTION, ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE, \
     SWAP_HORIZONTAL, SWAP_VERTICAL, SMASH, PASS, PAINT, COMBINE
 
+if TYPE_CHECKING:
+    import pygame
+
+# The actions a computer player may choose from, which are all but PASS.
+_MOVES = [ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE, SWAP_HORIZONTAL,
+          SWAP_VERTICAL, SMASH, COMBINE, PAINT]
+
+# The number of random moves a RandomPlayer tries before it gives up and
+# passes, which only happens on boards where almost nothing can be done.
+_MAX_TRIES = 1000
+
 
 def create_players(num_human: int, num_random: int, smart_players: List[int]) \
         -> List[Player]:
@@ -46,9 +60,17 @@ def create_players(num_human: int, num_random: int, smart_players: List[int]) \
     objects as the length of <smart_players>. The difficulty levels in
     <smart_players> should be applied to each SmartPlayer object, in order.
     """
-    # TODO: Implement Me
-    goals = generate_goals(1)  # FIXME
-    return [HumanPlayer(0, goals[0])]  # FIXME
+    goals = generate_goals(num_human + num_random + len(smart_players))
+    players = []
+    for _ in range(num_human):
+        players.append(HumanPlayer(len(players), goals[len(players)]))
+    for _ in range(num_random):
+        players.append(RandomPlayer(len(players), goals[len(players)]))
+    for difficulty in smart_players:
+        players.append(SmartPlayer(len(players), goals[len(players)],
+                                   difficulty))
+
+    return players
 
 
 def _get_block(block: Block, location: Tuple[int, int], level: int) -> \
@@ -69,8 +91,20 @@ def _get_block(block: Block, location: Tuple[int, int], level: int) -> \
     Preconditions:
         - 0 <= level <= max_depth
     """
-    # TODO: Implement me
-    return None  # FIXME
+    x, y = location
+    bx, by = block.position
+    if not (bx <= x < bx + block.size and by <= y < by + block.size):
+        return None
+
+    if block.level == level or len(block.children) == 0:
+        return block
+
+    for child in block.children:
+        found = _get_block(child, location, level)
+        if found is not None:
+            return found
+
+    return None
 
 
 class Player:
@@ -100,6 +134,13 @@ class Player:
         """
         raise NotImplementedError
 
+    def proceed(self) -> None:
+        """Let this player make a move the next time generate_move is called,
+        as a click of the mouse would.
+
+        Players that do not wait for a click ignore this.
+        """
+
     def process_event(self, event: pygame.event.Event) -> None:
         """Update this player based on the pygame event.
         """
@@ -124,6 +165,26 @@ def _create_move(action: Tuple[str, Optional[int]], block: Block) -> \
     return action[0], action[1], block
 
 
+def _random_valid_move(board: Block, colour: Tuple[int, int, int],
+                       journal: Journal) \
+        -> Optional[Tuple[Tuple[str, Optional[int]], Block]]:
+    """Perform a random valid move on <board>, painting with <colour>, and
+    record it in <journal> so that it can be undone. Return the action and the
+    block it was performed on, or None if no valid move was found.
+    """
+    x, y = board.position
+    for _ in range(_MAX_TRIES):
+        action = random.choice(_MOVES)
+        location = (x + random.randrange(board.size),
+                    y + random.randrange(board.size))
+        block = _get_block(board, location,
+                           random.randint(0, board.max_depth))
+        if perform_action(block, action, colour, journal):
+            return action, block
+
+    return None
+
+
 class HumanPlayer(Player):
     """A human player.
     """
@@ -155,6 +216,7 @@ class HumanPlayer(Player):
 
         If no block is selected by the player, return None.
         """
+        import pygame
         mouse_pos = pygame.mouse.get_pos()
         block = _get_block(board, mouse_pos, self._level)
 
@@ -165,6 +227,7 @@ class HumanPlayer(Player):
         the mapping in KEY_ACTION, as well as the W and S keys for changing
         the level.
         """
+        import pygame
         if event.type == pygame.KEYDOWN:
             if event.key in KEY_ACTION:
                 self._desired_action = KEY_ACTION[event.key]
@@ -194,6 +257,8 @@ class HumanPlayer(Player):
 
 
 class RandomPlayer(Player):
+    """A computer player that makes random valid moves.
+    """
     # === Private Attributes ===
     # _proceed:
     #   True when the player should make a move, False when the player should
@@ -201,13 +266,19 @@ class RandomPlayer(Player):
     _proceed: bool
 
     def __init__(self, player_id: int, goal: Goal) -> None:
-        # TODO: Implement Me
+        """Initialize this RandomPlayer with <player_id> and <goal>.
+        """
+        Player.__init__(self, player_id, goal)
         self._proceed = False
 
     def get_selected_block(self, board: Block) -> Optional[Block]:
         return None
 
+    def proceed(self) -> None:
+        self._proceed = True
+
     def process_event(self, event: pygame.event.Event) -> None:
+        import pygame
         if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
             self._proceed = True
 
@@ -223,27 +294,48 @@ class RandomPlayer(Player):
         if not self._proceed:
             return None  # Do not remove
 
-        # TODO: Implement Me
+        # The move is tried on <board> itself and then undone.
+        journal = Journal()
+        found = _random_valid_move(board, self.goal.colour, journal)
+        if found is None:
+            move = _create_move(PASS, board)
+        else:
+            journal.undo()
+            move = _create_move(found[0], found[1])
 
         self._proceed = False  # Must set to False before returning!
-        return None  # FIXME
+        return move
 
 
 class SmartPlayer(Player):
+    """A computer player that tries several random valid moves and makes the
+    one that scores best.
+    """
     # === Private Attributes ===
     # _proceed:
     #   True when the player should make a move, False when the player should
     #   wait.
+    # _difficulty:
+    #   The number of random valid moves to try before choosing one.
     _proceed: bool
+    _difficulty: int
 
     def __init__(self, player_id: int, goal: Goal, difficulty: int) -> None:
-        # TODO: Implement Me
+        """Initialize this SmartPlayer with <player_id> and <goal>, trying
+        <difficulty> moves each turn.
+        """
+        Player.__init__(self, player_id, goal)
+        self._difficulty = difficulty
         self._proceed = False
 
     def get_selected_block(self, board: Block) -> Optional[Block]:
         return None
 
+    def proceed(self) -> None:
+        self._proceed = True
+
     def process_event(self, event: pygame.event.Event) -> None:
+        import pygame
         if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
             self._proceed = True
 
@@ -262,10 +354,28 @@ class SmartPlayer(Player):
         if not self._proceed:
             return None  # Do not remove
 
-        # TODO: Implement Me
+        # Each move is tried on <board> itself and then undone. Since a move
+        # only changes the subtree of its block, the goal's state is updated
+        # from that subtree after the move and again after undoing it.
+        journal = Journal()
+        state = self.goal.new_state(board)
+        best_score = state.score(self.goal)
+        move = _create_move(PASS, board)
+        for _ in range(self._difficulty):
+            found = _random_valid_move(board, self.goal.colour, journal)
+            if found is None:
+                break
+            state.changed(found[1])
+            score = state.score(self.goal)
+            journal.undo()
+            state.changed(found[1])
+
+            if score > best_score:
+                best_score = score
+                move = _create_move(found[0], found[1])
 
         self._proceed = False  # Must set to False before returning!
-        return None  # FIXME
+        return move
 
 
 if __name__ == '__main__':
@@ -275,7 +385,7 @@ if __name__ == '__main__':
         'allowed-io': ['process_event'],
         'allowed-import-modules': [
             'doctest', 'python_ta', 'random', 'typing', 'actions', 'block',
-            'goal', 'pygame', '__future__'
+            'engine', 'goal', 'pygame', '__future__'
         ],
         'max-attributes': 10,
         'generated-members': 'pygame.*'
@@ -0,0 +1,251 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains a tournament runner that plays many seeded games between
+computer players, spread over a pool of processes, and collects how well each
+kind of player did.
+
+Every game seeds the random module from its own configuration before it
+starts, so the outcome of a game depends only on its configuration and not
+on which process plays it or how many processes there are.
+"""
+from __future__ import annotations
+from typing import Dict, List, Optional
+import multiprocessing
+import random
+import statistics
+import time
+
+from block import generate_board
+from engine import play_game
+from player import create_players
+from settings import BOARD_SIZE
+
+
+class GameConfig:
+    """The settings of one game in a tournament.
+
+    === Public Attributes ===
+    max_depth:
+        The deepest level allowed in the board.
+    num_random:
+        The number of RandomPlayers, who come first.
+    smart_players:
+        The difficulty of each SmartPlayer, who come after the RandomPlayers.
+    num_turns:
+        The number of turns in the game.
+    seed:
+        The seed of the random module for this game.
+
+    === Representation Invariants ===
+    - num_random + len(smart_players) >= 1
+    """
+    max_depth: int
+    num_random: int
+    smart_players: List[int]
+    num_turns: int
+    seed: int
+
+    def __init__(self, max_depth: int, num_random: int,
+                 smart_players: List[int], num_turns: int, seed: int) -> None:
+        """Initialize this configuration.
+
+        Precondition: num_random + len(smart_players) >= 1
+        """
+        self.max_depth = max_depth
+        self.num_random = num_random
+        self.smart_players = smart_players
+        self.num_turns = num_turns
+        self.seed = seed
+
+    def player_names(self) -> List[str]:
+        """Return the name of the kind of each player, in order of player ID.
+
+        >>> GameConfig(3, 1, [5, 10], 5, 0).player_names()
+        ['Random', 'Smart(5)', 'Smart(10)']
+        """
+        return ['Random'] * self.num_random + \
+            [f'Smart({difficulty})' for difficulty in self.smart_players]
+
+
+class GameOutcome:
+    """The outcome of one game in a tournament.
+
+    === Public Attributes ===
+    config:
+        The settings the game was played with.
+    scores:
+        The score of each player, including penalties, in order of player ID.
+    winner:
+        The ID of the winning player.
+    seconds:
+        The time it took to play the game.
+    """
+    config: GameConfig
+    scores: List[int]
+    winner: int
+    seconds: float
+
+    def __init__(self, config: GameConfig, scores: List[int], winner: int,
+                 seconds: float) -> None:
+        """Initialize this outcome.
+        """
+        self.config = config
+        self.scores = scores
+        self.winner = winner
+        self.seconds = seconds
+
+
+def play_one(config: GameConfig) -> GameOutcome:
+    """Play the game described by <config> and return its outcome.
+    """
+    start = time.perf_counter()
+    random.seed(config.seed)
+    board = generate_board(config.max_depth, BOARD_SIZE)
+    players = create_players(0, config.num_random, config.smart_players)
+    result = play_game(board, players, config.num_turns)
+
+    return GameOutcome(config,
+                       [goal_score - penalty
+                        for _, goal_score, penalty in result.scores],
+                       result.winner, time.perf_counter() - start)
+
+
+def make_configs(num_games: int, depths: List[int],
+                 mixes: List[List[Optional[int]]], num_turns: int,
+                 seed: int = 0) -> List[GameConfig]:
+    """Return <num_games> configurations that cycle through every pair of a
+    depth from <depths> and a player mix from <mixes>, each with its own seed
+    drawn from <seed>.
+
+    A player mix lists the players of a game: None for a RandomPlayer, or
+    the difficulty of a SmartPlayer.
+
+    >>> configs = make_configs(3, [3, 4], [[None, 5]], 10)
+    >>> [(c.max_depth, c.num_random, c.smart_players) for c in configs]
+    [(3, 1, [5]), (4, 1, [5]), (3, 1, [5])]
+    """
+    rng = random.Random(seed)
+    settings = [(depth, mix) for mix in mixes for depth in depths]
+    configs = []
+    for i in range(num_games):
+        depth, mix = settings[i % len(settings)]
+        smart = [difficulty for difficulty in mix if difficulty is not None]
+        configs.append(GameConfig(depth, len(mix) - len(smart), smart,
+                                  num_turns, rng.getrandbits(32)))
+
+    return configs
+
+
+class TournamentResult:
+    """The outcomes of all the games of a tournament.
+
+    === Public Attributes ===
+    outcomes:
+        The outcome of each game, in the order the games were given.
+    seconds:
+        The wall-clock time the whole tournament took.
+    """
+    outcomes: List[GameOutcome]
+    seconds: float
+
+    def __init__(self, outcomes: List[GameOutcome], seconds: float) -> None:
+        """Initialize this result.
+        """
+        self.outcomes = outcomes
+        self.seconds = seconds
+
+    def scores(self) -> Dict[str, List[int]]:
+        """Return every score reached by each kind of player, by name.
+        """
+        result = {}
+        for outcome in self.outcomes:
+            for name, score in zip(outcome.config.player_names(),
+                                   outcome.scores):
+                result.setdefault(name, []).append(score)
+
+        return result
+
+    def win_rates(self) -> Dict[str, float]:
+        """Return, for each kind of player, the fraction of the games it
+        played in that it won.
+
+        A player that plays a game twice, such as two RandomPlayers, counts
+        as two chances to win it.
+        """
+        played = {}
+        won = {}
+        for outcome in self.outcomes:
+            names = outcome.config.player_names()
+            for name in names:
+                played[name] = played.get(name, 0) + 1
+                won.setdefault(name, 0)
+            won[names[outcome.winner]] += 1
+
+        return {name: won[name] / played[name] for name in played}
+
+    def summary(self) -> str:
+        """Return a table of the win rate and score distribution of each kind
+        of player, followed by the timing of the tournament.
+        """
+        lines = ['player      games  win rate  mean score  stdev  '
+                 'min  median  max']
+        win_rates = self.win_rates()
+        for name, scores in sorted(self.scores().items()):
+            stdev = statistics.pstdev(scores)
+            lines.append(f'{name:10}  {len(scores):5}  {win_rates[name]:8.3f}'
+                         f'  {statistics.mean(scores):10.2f}  {stdev:5.2f}'
+                         f'  {min(scores):3}  {statistics.median(scores):6}'
+                         f'  {max(scores):3}')
+
+        game_seconds = [outcome.seconds for outcome in self.outcomes]
+        lines.append(f'{len(self.outcomes)} games in {self.seconds:.2f} s, '
+                     f'{statistics.mean(game_seconds) * 1000:.1f} ms of '
+                     f'play per game')
+
+        return '\n'.join(lines)
+
+
+def run_tournament(configs: List[GameConfig],
+                   processes: Optional[int] = None) -> TournamentResult:
+    """Play the game described by each of <configs> and return the result.
+
+    The games are spread over <processes> worker processes, or one per CPU
+    if <processes> is None. With a single process, the games are played in
+    this process. The outcomes are the same whatever the number of
+    processes.
+    """
+    start = time.perf_counter()
+    if processes == 1:
+        outcomes = [play_one(config) for config in configs]
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            # Games take very different times, so hand them out one by one.
+            outcomes = pool.map(play_one, configs, chunksize=1)
+
+    return TournamentResult(outcomes, time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    # The difficulties of create_auto_game, against a RandomPlayer.
+    tournament = run_tournament(make_configs(
+        48, [3, 4, 5], [[5, 10], [None, 5, 10]], 10))
+    print(tournament.summary())